@@ -1,5 +1,7 @@
 # extended_b_plus_tree.py
 
+from bisect import bisect_left, bisect_right
+
 class BPlusNode:
     def __init__(self, leaf=False):
         self.leaf = leaf
@@ -16,9 +18,7 @@ class BPlusTree:
         return self._search_internal(self.root, k)
 
     def _search_internal(self, x, k):
-        i = 0
-        while i < len(x.keys) and k > x.keys[i]:
-            i += 1
+        i = bisect_left(x.keys, k)
         if x.leaf:
             if i < len(x.keys) and x.keys[i] == k:
                 return (x, i)
@@ -38,17 +38,10 @@ class BPlusTree:
             self._insert_non_full(root, k)
 
     def _insert_non_full(self, x, k):
-        i = len(x.keys) - 1
+        i = bisect_right(x.keys, k)
         if x.leaf:
-            x.keys.append(None)
-            while i >= 0 and k < x.keys[i]:
-                x.keys[i + 1] = x.keys[i]
-                i -= 1
-            x.keys[i + 1] = k
+            x.keys.insert(i, k)
         else:
-            while i >= 0 and k < x.keys[i]:
-                i -= 1
-            i += 1
             if len(x.children[i].keys) == (2 * self.t) - 1:
                 self._split_child(x, i)
                 if k > x.keys[i]:
@@ -77,9 +70,7 @@ class BPlusTree:
 
     def _delete_internal(self, x, k):
         t = self.t
-        i = 0
-        while i < len(x.keys) and k > x.keys[i]:
-            i += 1
+        i = bisect_left(x.keys, k)
         if x.leaf:
             if i < len(x.keys) and x.keys[i] == k:
                 x.keys.pop(i)
@@ -177,9 +168,7 @@ class BPlusTree:
     def _find_leaf(self, x, k):
         if x.leaf:
             return x
-        i = 0
-        while i < len(x.keys) and k > x.keys[i]:
-            i += 1
+        i = bisect_left(x.keys, k)
         return self._find_leaf(x.children[i], k)
 
     def print_tree(self):
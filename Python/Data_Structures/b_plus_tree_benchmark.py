@@ -0,0 +1,57 @@
+import argparse
+import random
+import time
+
+from b_plus_tree import BPlusTree
+
+class LinearScanBPlusTree(BPlusTree):
+    # The original per-node linear scan, kept only as a lookup baseline
+    def _search_internal(self, x, k):
+        i = 0
+        while i < len(x.keys) and k > x.keys[i]:
+            i += 1
+        if x.leaf:
+            if i < len(x.keys) and x.keys[i] == k:
+                return (x, i)
+            return None
+        return self._search_internal(x.children[i], k)
+
+def build_tree(tree_class, t, keys):
+    tree = tree_class(t)
+    for key in keys:
+        tree.insert(key)
+    return tree
+
+def lookups_per_second(tree, probes):
+    start = time.perf_counter()
+    for key in probes:
+        tree.search(key)
+    return len(probes) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="BPlusTree lookup throughput across minimum degrees")
+    parser.add_argument('--keys', type=int, default=100000)
+    parser.add_argument('--probes', type=int, default=100000)
+    parser.add_argument('--degrees', type=int, nargs='+', default=[2, 4, 8, 16, 32, 64, 128, 256])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    keys = rng.sample(range(args.keys * 10), args.keys)
+    # Half the probes hit stored keys, half miss
+    probes = [rng.choice(keys) if i % 2 else rng.randrange(args.keys * 10) for i in range(args.probes)]
+
+    print(f"{'t':>5} {'insert s':>10} {'bisect lookups/s':>18} {'linear lookups/s':>18} {'speedup':>8}")
+    for t in args.degrees:
+        start = time.perf_counter()
+        tree = build_tree(BPlusTree, t, keys)
+        insert_seconds = time.perf_counter() - start
+        baseline = LinearScanBPlusTree(t)
+        baseline.root = tree.root
+        bisect_rate = lookups_per_second(tree, probes)
+        linear_rate = lookups_per_second(baseline, probes)
+        print(f"{t:>5} {insert_seconds:>10.3f} {bisect_rate:>18,.0f} {linear_rate:>18,.0f} "
+              f"{bisect_rate / linear_rate:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import traffic_jam as tj
+
+class RouteService:
+    def __init__(self, city_map, workers=4, batch_window=0.002):
+        self.city_map = city_map
+        self.batch_window = batch_window
+        self.executor = ThreadPoolExecutor(workers)
+        self.in_flight = {}
+        self.pending = {}
+        self.requests = 0
+        self.coalesced = 0
+        self.searches = 0
+        tj.prepare_routing(city_map, "compiled")
+
+    async def route(self, start_street, end_street, time_period):
+        self.requests += 1
+        key = (time_period, start_street, end_street)
+        future = self.in_flight.get(key)
+        if future is not None:
+            # Identical request already queued or running; share its answer
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.in_flight[key] = future
+        source_key = (time_period, start_street)
+        group = self.pending.get(source_key)
+        if group is None:
+            # Requests from the same source within the batch window share one single-source search
+            group = self.pending[source_key] = {}
+            loop.call_later(self.batch_window, self._flush, source_key)
+        group[end_street] = future
+        return await asyncio.shield(future)
+
+    def _flush(self, source_key):
+        group = self.pending.pop(source_key)
+        time_period, start_street = source_key
+        self.searches += 1
+        loop = asyncio.get_running_loop()
+        search = loop.run_in_executor(self.executor, tj.routes_from, self.city_map,
+                                      start_street, list(group), time_period)
+        search.add_done_callback(lambda done: self._deliver(source_key, group, done))
+
+    def _deliver(self, source_key, group, done):
+        time_period, start_street = source_key
+        for end_street, future in group.items():
+            del self.in_flight[(time_period, start_street, end_street)]
+            if future.cancelled():
+                continue
+            if done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result()[end_street])
+
+    def stats(self):
+        return {"requests": self.requests, "coalesced": self.coalesced, "searches": self.searches,
+                "in_flight": len(self.in_flight)}
+
+    def close(self):
+        self.executor.shutdown()
+
+async def _handle_connection(service, reader, writer):
+    # One JSON object per line in each direction: {"start", "end", "period"} -> route result
+    async def answer(request):
+        path, total_time = await service.route(request["start"], request["end"], request["period"])
+        return dict(request, path=path, total_time=total_time if total_time != math.inf else None)
+
+    async def respond(line):
+        request = {}
+        try:
+            request = json.loads(line)
+            reply = await answer(request)
+        except (ValueError, KeyError, TypeError) as error:
+            # Echo the id even on failure so the client can match the reply to its request
+            reply = {"id": request.get("id") if isinstance(request, dict) else None, "error": str(error)}
+        writer.write((json.dumps(reply) + "\n").encode('utf-8'))
+        # Wait for the socket to accept the reply, so a slow reader throttles this connection
+        await writer.drain()
+
+    tasks = set()
+    try:
+        while line := await reader.readline():
+            task = asyncio.create_task(respond(line))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            # Stop reading new requests while the client is not reading replies
+            await writer.drain()
+        if tasks:
+            await asyncio.gather(*tasks)
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def start_server(service, host='127.0.0.1', port=0):
+    return await asyncio.start_server(lambda reader, writer: _handle_connection(service, reader, writer),
+                                      host, port)
+
+class RouteClient:
+    # Replies can arrive out of order, so each request carries an id that the server echoes back
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.waiting = {}
+        self.next_id = 0
+        self.listener = asyncio.create_task(self._listen())
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _listen(self):
+        while line := await self.reader.readline():
+            reply = json.loads(line)
+            future = self.waiting.pop(reply.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(reply)
+        for future in self.waiting.values():
+            future.set_exception(ConnectionError("route server closed the connection"))
+
+    async def route(self, start_street, end_street, time_period):
+        request_id = self.next_id
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.waiting[request_id] = future
+        self.writer.write((json.dumps({"id": request_id, "start": start_street, "end": end_street,
+                                       "period": time_period}) + "\n").encode('utf-8'))
+        await self.writer.drain()
+        reply = await future
+        if "error" in reply:
+            raise ValueError(reply["error"])
+        total_time = reply["total_time"]
+        return reply["path"], total_time if total_time is not None else math.inf
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.cancel()
+
+async def serve(data_path, host, port, workers):
+    service = RouteService(tj.load_city_data(data_path), workers)
+    server = await start_server(service, host, port)
+    print(f"Serving routes on {', '.join(str(sock.getsockname()) for sock in server.sockets)}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Asyncio Pylandia route service (JSON lines over TCP)")
+    parser.add_argument('--data', default=tj.DEFAULT_DATA_PATH)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.data, args.host, args.port, args.workers))
+
+if __name__ == "__main__":
+    main()
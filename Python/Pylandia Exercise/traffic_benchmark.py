@@ -0,0 +1,192 @@
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import traffic_jam as tj
+
+def period_keys(periods):
+    keys = []
+    for i in range(periods):
+        minutes = round(tj.MINUTES_PER_DAY * (i + 1) / periods)
+        keys.append(f"{minutes // 60:02d}{minutes % 60:02d}")
+    return keys
+
+def _period_data(streets, edges, periods, rng):
+    # Each period scales the base times by a congestion factor plus per-street noise
+    data = {}
+    for key in period_keys(periods):
+        congestion = rng.uniform(1.0, 2.5)
+        data[key] = {name: {} for name in streets}
+        for from_street, to_street, base_time in edges:
+            data[key][from_street][to_street] = max(1, round(base_time * congestion * rng.uniform(0.8, 1.2)))
+    return data
+
+def grid_city(streets, periods, seed=0):
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(streets))
+    names = [f"Grid {row}_{col}" for row in range(side) for col in range(side)]
+    edges = []
+    for row in range(side):
+        for col in range(side):
+            here = names[row * side + col]
+            for d_row, d_col in ((0, 1), (1, 0)):
+                if row + d_row < side and col + d_col < side:
+                    there = names[(row + d_row) * side + col + d_col]
+                    base_time = rng.randint(1, 10)
+                    edges.append((here, there, base_time))
+                    edges.append((there, here, base_time))
+    return _period_data(names, edges, periods, rng)
+
+def geometric_city(streets, periods, seed=0, degree=6):
+    rng = random.Random(seed)
+    points = [(rng.random(), rng.random()) for _ in range(streets)]
+    names = [f"Road {i}" for i in range(streets)]
+    # Radius chosen so the expected number of neighbours is about `degree`
+    radius = math.sqrt(degree / (math.pi * max(streets, 1)))
+    cell_of = {}
+    for i, (x, y) in enumerate(points):
+        cell_of.setdefault((int(x / radius), int(y / radius)), []).append(i)
+    edges = []
+    for i, (x, y) in enumerate(points):
+        cell_x, cell_y = int(x / radius), int(y / radius)
+        for d_x in (-1, 0, 1):
+            for d_y in (-1, 0, 1):
+                for j in cell_of.get((cell_x + d_x, cell_y + d_y), []):
+                    if j <= i:
+                        continue
+                    length = math.dist(points[i], points[j])
+                    if length <= radius:
+                        base_time = max(1, round(length / radius * 10))
+                        edges.append((names[i], names[j], base_time))
+                        edges.append((names[j], names[i], base_time))
+    return _period_data(names, edges, periods, rng)
+
+def time_call(function, *args, repeat=1):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+def summarize(name, samples, **extra):
+    return dict({
+        "name": name,
+        "count": len(samples),
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "max_s": max(samples),
+    }, **extra)
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(kind="grid", streets=400, periods=5, queries=200, seed=0,
+                   methods=("dijkstra", "bidirectional", "alt", "ch", "compiled")):
+    generator = grid_city if kind == "grid" else geometric_city
+    data = generator(streets, periods, seed)
+    results = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_path = os.path.join(directory, 'city.json')
+        with open(data_path, 'w') as file:
+            json.dump(data, file)
+        samples, city_map = time_call(tj.load_city_data, data_path, repeat=3)
+        results.append(summarize("load_city_data", samples, bytes=os.path.getsize(data_path)))
+        samples, _ = time_call(tj.load_shared_topology, data_path, repeat=3)
+        results.append(summarize("load_shared_topology", samples, bytes=os.path.getsize(data_path)))
+
+    rng = random.Random(seed + 1)
+    period_list = list(city_map.time)
+    names = list(city_map.time[period_list[0]].vertices)
+    workload = [(rng.choice(names), rng.choice(names), rng.choice(period_list)) for _ in range(queries)]
+
+    for label, prepare in (("preprocess:freeze", lambda graph: graph.freeze()),
+                           ("preprocess:landmarks", lambda graph: tj.Landmarks(graph)),
+                           ("preprocess:contract", lambda graph: tj.ContractionHierarchy(graph))):
+        samples = [time_call(prepare, graph)[0][0] for graph in city_map.time.values()]
+        results.append(summarize(label, samples))
+    city_map.prepare_landmarks()
+    city_map.contract()
+
+    shared_samples, shared = time_call(tj.SharedTopologyMap.from_city_map, city_map)
+    results.append(summarize("preprocess:shared_topology", shared_samples))
+    samples, hierarchy = time_call(shared.customizable_hierarchy)
+    results.append(summarize("preprocess:cch_topology", samples))
+    samples = [time_call(hierarchy.customize, shared.weights[period])[0][0] for period in period_list]
+    results.append(summarize("preprocess:cch_customize", samples))
+
+    for method in methods:
+        samples = []
+        for start_street, end_street, time_period in workload:
+            elapsed, _ = time_call(tj.find_shortest_path, city_map, start_street, end_street, time_period, method)
+            samples.extend(elapsed)
+        results.append(summarize(f"query:{method}", samples))
+    for queue in (tj.PriorityQueue, tj.IndexedPriorityQueue, tj.RadixHeap):
+        samples = []
+        for start_street, end_street, time_period in workload:
+            graph = city_map.time[time_period]
+            elapsed, _ = time_call(tj.dijkstra, graph, graph.vertices[start_street], graph.vertices[end_street],
+                                   None, queue)
+            samples.extend(elapsed)
+        results.append(summarize(f"query:dijkstra[{queue.__name__}]", samples))
+
+    sources = names[:min(len(names), 20)]
+    samples, _ = time_call(tj.travel_time_matrix, city_map, sources, names, period_list[0])
+    results.append(summarize("batch:travel_time_matrix", samples, sources=len(sources), targets=len(names)))
+    with tj.RoutingPool(city_map, workers=4, method="compiled") as pool:
+        samples, _ = time_call(lambda: list(pool.map(workload)))
+    results.append(summarize("batch:routing_pool_threads", samples, queries=len(workload)))
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"kind": kind, "streets": len(names), "periods": periods, "queries": queries, "seed": seed},
+        "results": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Pylandia routing on synthetic cities")
+    parser.add_argument('--kind', choices=["grid", "geometric"], default="grid")
+    parser.add_argument('--streets', type=int, default=400)
+    parser.add_argument('--periods', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="append the JSON report to this file as one line")
+    parser.add_argument('--generate', metavar='PATH',
+                        help="only write the synthetic city in traffic_routes.json format")
+    args = parser.parse_args(argv)
+
+    if args.generate:
+        generator = grid_city if args.kind == "grid" else geometric_city
+        with open(args.generate, 'w') as file:
+            json.dump(generator(args.streets, args.periods, args.seed), file)
+        return
+
+    report = run_benchmarks(args.kind, args.streets, args.periods, args.queries, args.seed)
+    for row in report["results"]:
+        print(f"{row['name']:<36} median {row['median_s'] * 1000:9.3f} ms  (n={row['count']})", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'a') as file:
+            file.write(json.dumps(report) + "\n")
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,33 @@
+import argparse
+import csv
+import hashlib
 import json
-from heapq import heappush, heappop
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from heapq import heapify, heappush, heappop
 import math
 import itertools
+import mmap
+import os
+import sys
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds up the all-pairs tables; everything else is stdlib
+    np = None
+
+# Versions are unique across graphs so a replaced period never reuses a stale cache entry
+_graph_versions = itertools.count()
+
+# All-pairs tables hold two n^2 arrays; larger periods are routed with the compiled search instead
+ALL_PAIRS_MAX_VERTICES = 2000
 
 class Vertex:
     def __init__(self, name):
-        self.visited = False
         self.name = name
         self.connections = {}
     
@@ -15,32 +37,180 @@ class Vertex:
 class Graph:
     def __init__(self):
         self.vertices = {}
+        self.version = next(_graph_versions)
+        self.hierarchy = None
+        self.reverse = None
+        self.landmarks = None
+        self.frozen = None
+        self.trees = {}
+        self.integral = None
+        self.hub_labels = None
+        self.arc_flags = None
+        self.all_pairs = None
     
     def add_vertex(self, name):
         if name not in self.vertices:
             new_vertex = Vertex(name)
             self.vertices[name] = new_vertex
+            self._clear_indexes()
         return self.vertices[name]
     
     def add_edge(self, from_name, to_name, travel_time):
         from_vertex = self.add_vertex(from_name)
         to_vertex = self.add_vertex(to_name)
+        if from_vertex.connections.get(to_vertex) == travel_time:
+            return
+        from_vertex.add_connections(to_vertex, travel_time)
+        self._clear_indexes()
+
+    def _clear_indexes(self):
+        self.version = next(_graph_versions)
+        self.hierarchy = None
+        self.reverse = None
+        self.landmarks = None
+        self.frozen = None
+        self.trees = {}
+        self.integral = None
+        self.hub_labels = None
+        self.arc_flags = None
+        self.all_pairs = None
+
+    def integer_weights(self):
+        integral = self.integral
+        if integral is None:
+            integral = self.integral = all(
+                isinstance(travel_time, int) and travel_time >= 0
+                for vertex in self.vertices.values() for travel_time in vertex.connections.values())
+        return integral
+
+    def update_edge_weight(self, from_name, to_name, travel_time):
+        from_vertex = self.vertices.get(from_name)
+        to_vertex = self.vertices.get(to_name)
+        if from_vertex is None or to_vertex not in from_vertex.connections:
+            self.add_edge(from_name, to_name, travel_time)
+            return
+        old_time = from_vertex.connections[to_vertex]
+        if old_time == travel_time:
+            return
         from_vertex.add_connections(to_vertex, travel_time)
+        self.version = next(_graph_versions)
+
+        # Patch what can be patched in place; the hierarchy has no cheap repair and is rebuilt lazily
+        self.hierarchy = None
+        self.hub_labels = None
+        self.arc_flags = None
+        self.all_pairs = None
+        if not (isinstance(travel_time, int) and travel_time >= 0):
+            self.integral = False
+        elif self.integral is False:
+            self.integral = None
+        if self.reverse is not None:
+            self.reverse[to_vertex][from_vertex] = travel_time
+        if self.frozen is not None and not self.frozen.set_weight(from_name, to_name, travel_time):
+            self.frozen = None
+        if self.landmarks is not None:
+            self.landmarks.edge_changed(from_vertex, to_vertex, old_time, travel_time)
+        for tree in self.trees.values():
+            tree.edge_changed(from_vertex, to_vertex, old_time, travel_time)
+
+    def shortest_path_tree(self, source_name):
+        tree = self.trees.get(source_name)
+        if tree is None:
+            tree = self.trees[source_name] = ShortestPathTree(self, self.vertices[source_name])
+        return tree
+
+    # Lazy indexes are built in locals and published whole, so concurrent readers never see half of one
+    def freeze(self):
+        frozen = self.frozen
+        if frozen is None:
+            frozen = self.frozen = CompiledGraph.from_graph(self)
+        return frozen
+
+    def reverse_connections(self):
+        reverse = self.reverse
+        if reverse is None:
+            reverse = {vertex: {} for vertex in self.vertices.values()}
+            for vertex in self.vertices.values():
+                for neighbor, travel_time in vertex.connections.items():
+                    reverse[neighbor][vertex] = travel_time
+            self.reverse = reverse
+        return reverse
 
 class City_Map:
     def __init__(self):
         self.time = {}
+        self.time_dependent = None
+        self.shared = None
     
     def add_times(self, time_period):
         new_graph = Graph()
         self.time[time_period] = new_graph
         return new_graph
 
+    def contract(self, time_period=None):
+        periods = [time_period] if time_period is not None else list(self.time)
+        for period in periods:
+            graph = self.time[period]
+            if graph.hierarchy is None:
+                graph.hierarchy = ContractionHierarchy(graph)
+
+    def prepare_landmarks(self, time_period=None, count=4):
+        periods = [time_period] if time_period is not None else list(self.time)
+        for period in periods:
+            graph = self.time[period]
+            if graph.landmarks is None or graph.landmarks.count != count:
+                graph.landmarks = Landmarks(graph, count)
+
+    def build_hub_labels(self, time_period=None, workers=None):
+        periods = [time_period] if time_period is not None else list(self.time)
+        for period in periods:
+            graph = self.time[period]
+            if graph.hub_labels is None:
+                graph.hub_labels = HubLabels.build(graph, workers)
+
+    def prepare_arc_flags(self, time_period=None, regions=8, workers=None):
+        periods = [time_period] if time_period is not None else list(self.time)
+        for period in periods:
+            graph = self.time[period]
+            if graph.arc_flags is None:
+                graph.arc_flags = ArcFlags(graph.freeze(), regions, workers)
+
+    def prepare_all_pairs(self, time_period=None, max_vertices=ALL_PAIRS_MAX_VERTICES):
+        periods = [time_period] if time_period is not None else list(self.time)
+        for period in periods:
+            graph = self.time[period]
+            if graph.all_pairs is None and len(graph.vertices) <= max_vertices:
+                graph.all_pairs = AllPairs(graph.freeze())
+
+    def update_edge_weight(self, time_period, from_street, to_street, new_time):
+        self.time[time_period].update_edge_weight(from_street, to_street, new_time)
+
+    def shared_topology(self):
+        signature = tuple((period, graph.version) for period, graph in self.time.items())
+        shared = self.shared
+        if shared is None or shared.signature != signature:
+            shared = SharedTopologyMap.from_city_map(self)
+            shared.signature = signature
+            self.shared = shared
+        return shared
+
+    def time_dependent_graph(self):
+        signature = tuple((period, graph.version) for period, graph in self.time.items())
+        time_dependent = self.time_dependent
+        if time_dependent is None or time_dependent.signature != signature:
+            time_dependent = TimeDependentGraph(self)
+            time_dependent.signature = signature
+            self.time_dependent = time_dependent
+        return time_dependent
+
 class PriorityQueue:
     def __init__(self):
         self.elements = []
         self.counter = itertools.count()
     
+    def __len__(self):
+        return len(self.elements)
+
     def empty(self):
         return len(self.elements) == 0
     
@@ -51,15 +221,491 @@ class PriorityQueue:
     def get(self):
         return heappop(self.elements)[2]
 
-def dijkstra(graph, start_vertex, end_vertex):
+    def pop(self):
+        priority, _, item = heappop(self.elements)
+        return priority, item
+
+    def peek_priority(self):
+        return self.elements[0][0]
+
+class IndexedPriorityQueue:
+    # d-ary min-heap with a position map, so each item has at most one entry and put() on a
+    # queued item performs decrease-key instead of pushing a duplicate
+    def __init__(self, arity=4):
+        self.arity = arity
+        self.items = []
+        self.priorities = []
+        self.position = {}
+        self.stale = 0  # Decrease-key never leaves stale entries; kept for a uniform stats interface
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def empty(self):
+        return len(self.items) == 0
+
+    def put(self, item, priority):
+        if item in self.position:
+            self.decrease_key(item, priority)
+            return
+        self.items.append(item)
+        self.priorities.append(priority)
+        self.position[item] = len(self.items) - 1
+        self._sift_up(len(self.items) - 1)
+
+    def decrease_key(self, item, priority):
+        i = self.position[item]
+        if priority < self.priorities[i]:
+            self.priorities[i] = priority
+            self._sift_up(i)
+
+    def get(self):
+        return self.pop()[1]
+
+    def pop(self):
+        top = self.items[0]
+        top_priority = self.priorities[0]
+        del self.position[top]
+        last_item = self.items.pop()
+        last_priority = self.priorities.pop()
+        if self.items:
+            self.items[0] = last_item
+            self.priorities[0] = last_priority
+            self.position[last_item] = 0
+            self._sift_down(0)
+        return top_priority, top
+
+    def peek_priority(self):
+        return self.priorities[0]
+
+    def _sift_up(self, i):
+        items, priorities, position = self.items, self.priorities, self.position
+        item, priority = items[i], priorities[i]
+        while i > 0:
+            parent = (i - 1) // self.arity
+            if priorities[parent] <= priority:
+                break
+            items[i] = items[parent]
+            priorities[i] = priorities[parent]
+            position[items[i]] = i
+            i = parent
+        items[i] = item
+        priorities[i] = priority
+        position[item] = i
+
+    def _sift_down(self, i):
+        items, priorities, position = self.items, self.priorities, self.position
+        item, priority = items[i], priorities[i]
+        size = len(items)
+        while True:
+            first_child = self.arity * i + 1
+            if first_child >= size:
+                break
+            last_child = min(first_child + self.arity, size)
+            child = min(range(first_child, last_child), key=priorities.__getitem__)
+            if priorities[child] >= priority:
+                break
+            items[i] = items[child]
+            priorities[i] = priorities[child]
+            position[items[i]] = i
+            i = child
+        items[i] = item
+        priorities[i] = priority
+        position[item] = i
+
+class RadixHeap:
+    # Monotone radix heap for non-negative integer keys: an entry lives in the bucket named by the
+    # highest bit in which its key differs from the last extracted minimum
+    def __init__(self):
+        self.buckets = [[]]
+        self.last = 0
+        self.keys = {}
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def empty(self):
+        return len(self.keys) == 0
+
+    def put(self, item, priority):
+        if priority < self.last:
+            raise ValueError("RadixHeap keys must not drop below the last extracted key")
+        if priority >= self.keys.get(item, math.inf):
+            return
+        self.keys[item] = priority
+        self._place(priority, item)
+
+    def _place(self, priority, item):
+        bucket = (priority ^ self.last).bit_length()
+        while len(self.buckets) <= bucket:
+            self.buckets.append([])
+        self.buckets[bucket].append((priority, item))
+
+    def _refill(self):
+        smallest = self.buckets[0]
+        while True:
+            # Entries superseded by a later, smaller put are dropped lazily
+            while smallest and self.keys.get(smallest[-1][1]) != smallest[-1][0]:
+                smallest.pop()
+                self.stale += 1
+            if smallest:
+                return
+            # Split the first bucket with live entries around its minimum
+            for bucket in self.buckets[1:]:
+                live = [(priority, item) for priority, item in bucket if self.keys.get(item) == priority]
+                self.stale += len(bucket) - len(live)
+                bucket.clear()
+                if live:
+                    break
+            self.last = min(priority for priority, _ in live)
+            for priority, item in live:
+                self._place(priority, item)
+
+    def get(self):
+        return self.pop()[1]
+
+    def pop(self):
+        self._refill()
+        priority, item = self.buckets[0].pop()
+        del self.keys[item]
+        return priority, item
+
+    def peek_priority(self):
+        self._refill()
+        return self.buckets[0][-1][0]
+
+class QueryStats:
+    # Work counters are None for methods whose engine does not count them
+    def __init__(self):
+        self.method = None
+        self.time_period = None
+        self.total_time = None
+        self.settled = 0
+        self.relaxed = 0
+        self.pushes = 0
+        self.stale_pops = 0
+        self.peak_queue = 0
+        self.phases = {}
+
+    def as_dict(self):
+        row = {
+            "method": self.method,
+            "time_period": self.time_period,
+            "total_time": self.total_time,
+            "settled": self.settled,
+            "relaxed": self.relaxed,
+            "pushes": self.pushes,
+            "stale_pops": self.stale_pops,
+            "peak_queue": self.peak_queue,
+        }
+        for phase, seconds in self.phases.items():
+            row[f"{phase}_s"] = seconds
+        return row
+
+def dijkstra(graph, start_vertex, end_vertex, stats=None, queue=PriorityQueue):
+    # Counters are only touched when stats is given, so the plain path pays one local bool test.
+    # The heapq queue skips superseded entries lazily. IndexedPriorityQueue and RadixHeap never hold
+    # one, but in CPython their pure-Python bookkeeping costs more than C heapq, so they are opt-in;
+    # traffic_benchmark reports all three as query:dijkstra[<queue>]
+    instrumented = stats is not None
+    if instrumented:
+        started = time.perf_counter()
     distances = {vertex: math.inf for vertex in graph.vertices.values()}
     distances[start_vertex] = 0
-    pq = PriorityQueue()
+    # Radix buckets need non-negative integer keys; any other travel time falls back to heapq
+    if queue is RadixHeap and not graph.integer_weights():
+        queue = PriorityQueue
+    pq = queue()
     pq.put(start_vertex, 0)
     previous = {vertex: None for vertex in graph.vertices.values()}
+    if instrumented:
+        searching = time.perf_counter()
+        stats.phases["init"] = searching - started
+        stats.pushes += 1
+        peak = 1
+
+    while not pq.empty():
+        distance, current_vertex = pq.pop()
+        if distance > distances[current_vertex]:
+            if instrumented:
+                stats.stale_pops += 1
+            continue
+        if instrumented:
+            stats.settled += 1
+
+        if current_vertex == end_vertex:
+            path = []
+            while current_vertex:
+                path.append(current_vertex.name)
+                current_vertex = previous[current_vertex]
+            if instrumented:
+                _finish_stats(stats, pq, peak, searching)
+            return path[::-1], distance
+
+        for neighbor, weight in current_vertex.connections.items():
+            candidate = distance + weight
+            if candidate < distances[neighbor]:
+                distances[neighbor] = candidate
+                previous[neighbor] = current_vertex
+                pq.put(neighbor, candidate)
+                if instrumented:
+                    stats.relaxed += 1
+                    stats.pushes += 1
+                    peak = max(peak, len(pq))
+
+    if instrumented:
+        _finish_stats(stats, pq, peak, searching)
+    return None, math.inf  # No path found
+
+def _finish_stats(stats, pq, peak, searching):
+    stats.phases["search"] = time.perf_counter() - searching
+    stats.stale_pops += getattr(pq, "stale", 0)
+    stats.peak_queue = max(stats.peak_queue, peak)
+
+def reachable_within(city_map, start_street, budget, time_period):
+    if time_period not in city_map.time:
+        return
+    graph = city_map.time[time_period]
+    if start_street not in graph.vertices:
+        return
+    start_vertex = graph.vertices[start_street]
+    # Only vertices inside the budget ever get a label, so work is bounded by the isochrone size
+    distances = {start_vertex: 0}
+    settled = set()
+    pq = PriorityQueue()
+    pq.put(start_vertex, 0)
 
     while not pq.empty():
         current_vertex = pq.get()
+        if current_vertex in settled:
+            continue
+        settled.add(current_vertex)
+        yield current_vertex.name, distances[current_vertex]
+
+        for neighbor, weight in current_vertex.connections.items():
+            distance = distances[current_vertex] + weight
+            if distance <= budget and distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance
+                pq.put(neighbor, distance)
+
+def bidirectional_dijkstra(graph, start_vertex, end_vertex):
+    if start_vertex == end_vertex:
+        return [start_vertex.name], 0
+    reverse = graph.reverse_connections()
+    forward = {start_vertex: 0}
+    backward = {end_vertex: 0}
+    forward_previous = {start_vertex: None}
+    backward_next = {end_vertex: None}
+    forward_settled = set()
+    backward_settled = set()
+    forward_pq = PriorityQueue()
+    backward_pq = PriorityQueue()
+    forward_pq.put(start_vertex, 0)
+    backward_pq.put(end_vertex, 0)
+    best = math.inf
+    meeting = None
+
+    while not forward_pq.empty() and not backward_pq.empty():
+        # Stop once no undiscovered path can beat the best meeting found so far
+        if forward_pq.peek_priority() + backward_pq.peek_priority() >= best:
+            break
+        if len(forward_pq.elements) <= len(backward_pq.elements):
+            pq, distances, other, links, settled, edges = (
+                forward_pq, forward, backward, forward_previous, forward_settled, None)
+        else:
+            pq, distances, other, links, settled, edges = (
+                backward_pq, backward, forward, backward_next, backward_settled, reverse)
+        current_vertex = pq.get()
+        if current_vertex in settled:
+            continue
+        settled.add(current_vertex)
+
+        neighbors = current_vertex.connections if edges is None else edges[current_vertex]
+        for neighbor, weight in neighbors.items():
+            distance = distances[current_vertex] + weight
+            if distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance
+                links[neighbor] = current_vertex
+                pq.put(neighbor, distance)
+            if neighbor in other and distance + other[neighbor] < best:
+                best = distance + other[neighbor]
+                meeting = neighbor
+
+    if meeting is None:
+        return None, math.inf
+
+    path = []
+    current_vertex = meeting
+    while current_vertex:
+        path.append(current_vertex.name)
+        current_vertex = forward_previous[current_vertex]
+    path.reverse()
+    current_vertex = backward_next[meeting]
+    while current_vertex:
+        path.append(current_vertex.name)
+        current_vertex = backward_next[current_vertex]
+    return path, best
+
+class ShortestPathTree:
+    # Single-source tree kept exact under edge-weight changes (Ramalingam-Reps style repair);
+    # a reverse tree holds distances *to* the source over graph.reverse_connections()
+    def __init__(self, graph, source_vertex, reverse=False):
+        self.graph = graph
+        self.source = source_vertex
+        self.reverse = reverse
+        self.distances = {source_vertex: 0}
+        self.parent = {source_vertex: None}
+        self.children = {source_vertex: set()}
+        self._propagate([(0, 0, source_vertex)])
+
+    def _out_edges(self, vertex):
+        return self.graph.reverse_connections()[vertex] if self.reverse else vertex.connections
+
+    def _in_edges(self, vertex):
+        return vertex.connections if self.reverse else self.graph.reverse_connections()[vertex]
+
+    def _set_parent(self, vertex, parent):
+        old_parent = self.parent.get(vertex)
+        if old_parent is not None:
+            self.children[old_parent].discard(vertex)
+        self.parent[vertex] = parent
+        self.children.setdefault(vertex, set())
+        if parent is not None:
+            self.children[parent].add(vertex)
+
+    def _propagate(self, heap):
+        counter = itertools.count(len(heap))
+        while heap:
+            distance, _, current_vertex = heappop(heap)
+            if distance > self.distances.get(current_vertex, math.inf):
+                continue
+            for neighbor, weight in self._out_edges(current_vertex).items():
+                candidate = distance + weight
+                if candidate < self.distances.get(neighbor, math.inf):
+                    self.distances[neighbor] = candidate
+                    self._set_parent(neighbor, current_vertex)
+                    heappush(heap, (candidate, next(counter), neighbor))
+
+    def edge_changed(self, from_vertex, to_vertex, old_weight, new_weight):
+        if self.reverse:
+            from_vertex, to_vertex = to_vertex, from_vertex
+        if from_vertex not in self.distances:
+            return
+        if new_weight < old_weight:
+            candidate = self.distances[from_vertex] + new_weight
+            if candidate < self.distances.get(to_vertex, math.inf):
+                self.distances[to_vertex] = candidate
+                self._set_parent(to_vertex, from_vertex)
+                self._propagate([(candidate, 0, to_vertex)])
+            return
+        if self.parent.get(to_vertex) is not from_vertex:
+            return  # A heavier non-tree edge cannot change any distance
+
+        # Only the subtree hanging off the heavier edge can get longer
+        affected = []
+        stack = [to_vertex]
+        while stack:
+            vertex = stack.pop()
+            affected.append(vertex)
+            stack.extend(self.children[vertex])
+        for vertex in affected:
+            del self.distances[vertex]
+        # Seed each affected vertex from its best unaffected predecessor, then rerun Dijkstra over them
+        seeds = []
+        for vertex in affected:
+            best, best_parent = math.inf, None
+            for neighbor, weight in self._in_edges(vertex).items():
+                if neighbor in self.distances and self.distances[neighbor] + weight < best:
+                    best, best_parent = self.distances[neighbor] + weight, neighbor
+            seeds.append((vertex, best, best_parent))
+        heap = []
+        for vertex, best, best_parent in seeds:
+            self._set_parent(vertex, best_parent)
+            if best_parent is not None:
+                self.distances[vertex] = best
+                heap.append((best, len(heap), vertex))
+        heapify(heap)
+        self._propagate(heap)
+        for vertex in affected:
+            if vertex not in self.distances:
+                self.parent.pop(vertex, None)
+
+    def path_to(self, vertex):
+        if vertex not in self.distances:
+            return None, math.inf
+        path = []
+        current_vertex = vertex
+        while current_vertex is not None:
+            path.append(current_vertex.name)
+            current_vertex = self.parent[current_vertex]
+        if not self.reverse:
+            path.reverse()
+        return path, self.distances[vertex]
+
+class Landmarks:
+    def __init__(self, graph, count=4):
+        self.count = count
+        self.vertices = []
+        self.trees = []
+        self.from_landmark = []
+        self.to_landmark = []
+        candidates = list(graph.vertices.values())
+        if not candidates:
+            return
+        # Farthest-point selection: each new landmark maximizes its distance to the chosen ones
+        closest = {vertex: math.inf for vertex in candidates}
+        landmark = candidates[0]
+        while len(self.vertices) < min(count, len(candidates)):
+            self.vertices.append(landmark)
+            from_tree = ShortestPathTree(graph, landmark)
+            to_tree = ShortestPathTree(graph, landmark, reverse=True)
+            self.trees.extend((from_tree, to_tree))
+            # Tables alias the trees' distance dicts, so repairing a tree refreshes its bounds
+            from_distances = from_tree.distances
+            to_distances = to_tree.distances
+            self.from_landmark.append(from_distances)
+            self.to_landmark.append(to_distances)
+            for vertex in candidates:
+                spread = min(from_distances.get(vertex, math.inf), to_distances.get(vertex, math.inf))
+                closest[vertex] = min(closest[vertex], spread)
+            remaining = [vertex for vertex in candidates if vertex not in self.vertices]
+            if not remaining:
+                break
+            # Unreachable vertices get a landmark of their own first
+            landmark = max(remaining, key=lambda vertex: closest[vertex])
+
+    def edge_changed(self, from_vertex, to_vertex, old_weight, new_weight):
+        for tree in self.trees:
+            tree.edge_changed(from_vertex, to_vertex, old_weight, new_weight)
+
+    def lower_bound(self, vertex, target):
+        bound = 0
+        for from_distances, to_distances in zip(self.from_landmark, self.to_landmark):
+            if vertex in from_distances and target in from_distances:
+                bound = max(bound, from_distances[target] - from_distances[vertex])
+            if vertex in to_distances and target in to_distances:
+                bound = max(bound, to_distances[vertex] - to_distances[target])
+        return bound
+
+def alt_search(graph, start_vertex, end_vertex):
+    landmarks = graph.landmarks
+    if landmarks is None:
+        landmarks = graph.landmarks = Landmarks(graph)
+    distances = {start_vertex: 0}
+    previous = {start_vertex: None}
+    pq = PriorityQueue()
+    pq.put(start_vertex, landmarks.lower_bound(start_vertex, end_vertex))
+    settled = set()
+
+    while not pq.empty():
+        current_vertex = pq.get()
+        if current_vertex in settled:
+            continue
+        settled.add(current_vertex)
 
         if current_vertex == end_vertex:
             path = []
@@ -70,14 +716,799 @@ def dijkstra(graph, start_vertex, end_vertex):
 
         for neighbor, weight in current_vertex.connections.items():
             distance = distances[current_vertex] + weight
-            if distance < distances[neighbor]:
+            if distance < distances.get(neighbor, math.inf):
                 distances[neighbor] = distance
                 previous[neighbor] = current_vertex
-                pq.put(neighbor, distance)
+                pq.put(neighbor, distance + landmarks.lower_bound(neighbor, end_vertex))
 
-    return None, math.inf  # No path found
+    return None, math.inf
+
+class ContractionHierarchy:
+    def __init__(self, graph, witness_limit=50):
+        self.witness_limit = witness_limit
+        self.rank = {}
+        self.middle = {}  # (from, to) -> contracted street a shortcut bypasses
+        self.forward_up = {name: {} for name in graph.vertices}
+        self.backward_up = {name: {} for name in graph.vertices}
+        self._build(graph)
+
+    def _build(self, graph):
+        out_edges = {name: {} for name in graph.vertices}
+        in_edges = {name: {} for name in graph.vertices}
+        for name, vertex in graph.vertices.items():
+            for neighbor, weight in vertex.connections.items():
+                if neighbor.name == name:
+                    continue
+                if weight < out_edges[name].get(neighbor.name, math.inf):
+                    out_edges[name][neighbor.name] = weight
+                    in_edges[neighbor.name][name] = weight
+        edges = {(u, w): weight for u in out_edges for w, weight in out_edges[u].items()}
+        contracted_neighbors = {name: 0 for name in graph.vertices}
+
+        pq = PriorityQueue()
+        for name in graph.vertices:
+            pq.put(name, self._importance(name, out_edges, in_edges, contracted_neighbors))
+
+        while not pq.empty():
+            name = pq.get()
+            if name in self.rank:
+                continue
+            # Lazy update: re-evaluate and defer if a cheaper node is now on top
+            importance = self._importance(name, out_edges, in_edges, contracted_neighbors)
+            if not pq.empty() and importance > pq.peek_priority():
+                pq.put(name, importance)
+                continue
+            self.rank[name] = len(self.rank)
+            for u, w, weight in self._shortcuts(name, out_edges, in_edges):
+                out_edges[u][w] = weight
+                in_edges[w][u] = weight
+                edges[(u, w)] = weight
+                self.middle[(u, w)] = name
+            for neighbor in itertools.chain(out_edges[name], in_edges[name]):
+                contracted_neighbors[neighbor] += 1
+                out_edges[neighbor].pop(name, None)
+                in_edges[neighbor].pop(name, None)
+
+        for (u, w), weight in edges.items():
+            if self.rank[u] < self.rank[w]:
+                self.forward_up[u][w] = weight
+            else:
+                self.backward_up[w][u] = weight
+
+    def _importance(self, name, out_edges, in_edges, contracted_neighbors):
+        shortcuts = len(self._shortcuts(name, out_edges, in_edges))
+        removed = len(out_edges[name]) + len(in_edges[name])
+        return shortcuts - removed + contracted_neighbors[name]
+
+    def _shortcuts(self, name, out_edges, in_edges):
+        shortcuts = []
+        targets = out_edges[name]
+        if not targets:
+            return shortcuts
+        max_out = max(targets.values())
+        for u, in_weight in in_edges[name].items():
+            witness = self._witness_search(u, name, in_weight + max_out, out_edges)
+            for w, out_weight in targets.items():
+                if w == u:
+                    continue
+                via = in_weight + out_weight
+                if witness.get(w, math.inf) > via:
+                    shortcuts.append((u, w, via))
+        return shortcuts
+
+    def _witness_search(self, source, skip, limit, out_edges):
+        distances = {source: 0}
+        pq = PriorityQueue()
+        pq.put(source, 0)
+        settled = 0
+        while not pq.empty() and settled < self.witness_limit:
+            distance = pq.peek_priority()
+            current = pq.get()
+            if distance > distances[current]:
+                continue
+            if distance > limit:
+                break
+            settled += 1
+            for neighbor, weight in out_edges[current].items():
+                if neighbor == skip:
+                    continue
+                candidate = distance + weight
+                if candidate < distances.get(neighbor, math.inf):
+                    distances[neighbor] = candidate
+                    pq.put(neighbor, candidate)
+        return distances
+
+    def query(self, start, end):
+        if start not in self.rank or end not in self.rank:
+            return None, math.inf
+        forward = {start: (0, None)}
+        backward = {end: (0, None)}
+        forward_pq = PriorityQueue()
+        backward_pq = PriorityQueue()
+        forward_pq.put(start, 0)
+        backward_pq.put(end, 0)
+        best = math.inf
+        meeting = None
+
+        while not forward_pq.empty() or not backward_pq.empty():
+            for pq, labels, other, up in ((forward_pq, forward, backward, self.forward_up),
+                                          (backward_pq, backward, forward, self.backward_up)):
+                if pq.empty():
+                    continue
+                distance = pq.peek_priority()
+                current = pq.get()
+                if distance > labels[current][0]:
+                    continue
+                # Upward searches may only stop once the queue minimum passes best
+                if distance >= best:
+                    pq.elements.clear()
+                    continue
+                if current in other and distance + other[current][0] < best:
+                    best = distance + other[current][0]
+                    meeting = current
+                for neighbor, weight in up[current].items():
+                    candidate = distance + weight
+                    if candidate < labels.get(neighbor, (math.inf,))[0]:
+                        labels[neighbor] = (candidate, current)
+                        pq.put(neighbor, candidate)
+
+        if meeting is None:
+            return None, math.inf
+
+        up_path = []
+        current = meeting
+        while current is not None:
+            up_path.append(current)
+            current = forward[current][1]
+        up_path.reverse()
+        current = backward[meeting][1]
+        while current is not None:
+            up_path.append(current)
+            current = backward[current][1]
+
+        path = [up_path[0]]
+        for u, w in zip(up_path, up_path[1:]):
+            self._unpack(u, w, path)
+        return path, best
+
+    def _unpack(self, u, w, path):
+        stack = [(u, w)]
+        while stack:
+            u, w = stack.pop()
+            if (u, w) in self.middle:
+                v = self.middle[(u, w)]
+                stack.append((v, w))
+                stack.append((u, v))
+            else:
+                path.append(w)
+
+_hub_hierarchy = None
+
+def _init_hub_worker(forward_up, backward_up, rank):
+    global _hub_hierarchy
+    _hub_hierarchy = (forward_up, backward_up, rank)
+
+def _upward_label(up, rank, source):
+    distances = {source: 0}
+    heap = [(0, rank[source], source)]
+    while heap:
+        distance, _, current = heappop(heap)
+        if distance > distances[current]:
+            continue
+        for neighbor, weight in up[current].items():
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, math.inf):
+                distances[neighbor] = candidate
+                heappush(heap, (candidate, rank[neighbor], neighbor))
+    return sorted((rank[hub], distance) for hub, distance in distances.items())
+
+def _hub_label_chunk(names):
+    forward_up, backward_up, rank = _hub_hierarchy
+    return [(_upward_label(forward_up, rank, name), _upward_label(backward_up, rank, name)) for name in names]
+
+def _merge_labels(out_hubs, out_dists, out_start, out_end, in_hubs, in_dists, in_start, in_end):
+    best = math.inf
+    i, j = out_start, in_start
+    while i < out_end and j < in_end:
+        if out_hubs[i] == in_hubs[j]:
+            if out_dists[i] + in_dists[j] < best:
+                best = out_dists[i] + in_dists[j]
+            i += 1
+            j += 1
+        elif out_hubs[i] < in_hubs[j]:
+            i += 1
+        else:
+            j += 1
+    return best
+
+class HubLabels:
+    # Out-label of v: (hub rank, d(v, hub)); in-label: (hub rank, d(hub, v)), both sorted by hub rank.
+    # Labels are the upward CH search spaces, so every shortest path's top vertex is a shared hub
+    def __init__(self, names, out_offsets, out_hubs, out_dists, in_offsets, in_hubs, in_dists, integral):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+        self.out_offsets, self.out_hubs, self.out_dists = out_offsets, out_hubs, out_dists
+        self.in_offsets, self.in_hubs, self.in_dists = in_offsets, in_hubs, in_dists
+        self.integral = integral
+
+    @classmethod
+    def build(cls, graph, workers=None):
+        hierarchy = graph.hierarchy
+        if hierarchy is None:
+            hierarchy = graph.hierarchy = ContractionHierarchy(graph)
+        names = list(graph.vertices)
+        if workers is not None and workers > 1 and len(names) > 1:
+            chunk = -(-len(names) // (workers * 4))
+            chunks = [names[i:i + chunk] for i in range(0, len(names), chunk)]
+            with ProcessPoolExecutor(workers, initializer=_init_hub_worker,
+                                     initargs=(hierarchy.forward_up, hierarchy.backward_up, hierarchy.rank)) as pool:
+                labels = [label for part in pool.map(_hub_label_chunk, chunks) for label in part]
+        else:
+            _init_hub_worker(hierarchy.forward_up, hierarchy.backward_up, hierarchy.rank)
+            labels = _hub_label_chunk(names)
+
+        out_offsets, in_offsets = array('q', [0]), array('q', [0])
+        out_hubs, in_hubs = array('q'), array('q')
+        out_dists, in_dists = array('d'), array('d')
+        for out_label, in_label in labels:
+            for hub, distance in out_label:
+                out_hubs.append(hub)
+                out_dists.append(distance)
+            for hub, distance in in_label:
+                in_hubs.append(hub)
+                in_dists.append(distance)
+            out_offsets.append(len(out_hubs))
+            in_offsets.append(len(in_hubs))
+        labels = cls(names, out_offsets, out_hubs, out_dists, in_offsets, in_hubs, in_dists,
+                     graph.integer_weights())
+        labels._prune(hierarchy.rank)
+        return labels
+
+    def _prune(self, rank):
+        # Drop entries whose distance is not exact; the exact top-hub entries alone answer every query
+        by_rank = {rank[name]: self.index[name] for name in self.names}
+        keep_out = [self.distance_between(v, by_rank[self.out_hubs[i]]) >= self.out_dists[i]
+                    for v in range(len(self.names)) for i in range(self.out_offsets[v], self.out_offsets[v + 1])]
+        keep_in = [self.distance_between(by_rank[self.in_hubs[i]], v) >= self.in_dists[i]
+                   for v in range(len(self.names)) for i in range(self.in_offsets[v], self.in_offsets[v + 1])]
+        self.out_offsets, self.out_hubs, self.out_dists = _compact(self.out_offsets, self.out_hubs,
+                                                                   self.out_dists, keep_out)
+        self.in_offsets, self.in_hubs, self.in_dists = _compact(self.in_offsets, self.in_hubs,
+                                                                self.in_dists, keep_in)
+
+    def distance_between(self, source, target):
+        return _merge_labels(self.out_hubs, self.out_dists, self.out_offsets[source], self.out_offsets[source + 1],
+                             self.in_hubs, self.in_dists, self.in_offsets[target], self.in_offsets[target + 1])
+
+    def distance(self, start_street, end_street):
+        if start_street not in self.index or end_street not in self.index:
+            return math.inf
+        distance = self.distance_between(self.index[start_street], self.index[end_street])
+        if self.integral and distance != math.inf:
+            return int(distance)
+        return distance
+
+def _compact(offsets, hubs, dists, keep):
+    new_offsets, new_hubs, new_dists = array('q', [0]), array('q'), array('d')
+    for vertex in range(len(offsets) - 1):
+        for i in range(offsets[vertex], offsets[vertex + 1]):
+            if keep[i]:
+                new_hubs.append(hubs[i])
+                new_dists.append(dists[i])
+        new_offsets.append(len(new_hubs))
+    return new_offsets, new_hubs, new_dists
+
+def hub_distance(city_map, start_street, end_street, time_period):
+    if time_period not in city_map.time:
+        return math.inf
+    graph = city_map.time[time_period]
+    labels = graph.hub_labels
+    if labels is None:
+        labels = graph.hub_labels = HubLabels.build(graph)
+    return labels.distance(start_street, end_street)
+
+HUB_LABELS_MAGIC = b"PYLHUBS2"
+
+def _weights_fingerprint(graph):
+    # Edge count plus a digest of every (from, to, travel time), independent of insertion order
+    digest = hashlib.blake2b(digest_size=8)
+    edge_count = 0
+    for name in sorted(graph.vertices):
+        for neighbor, travel_time in sorted((neighbor.name, travel_time) for neighbor, travel_time
+                                            in graph.vertices[name].connections.items()):
+            digest.update(f"{name}\0{neighbor}\0{travel_time!r}\n".encode('utf-8'))
+            edge_count += 1
+    return edge_count, int.from_bytes(digest.digest(), 'little', signed=True)
+
+def save_hub_labels(city_map, file_path):
+    with open(file_path, 'wb') as file:
+        file.write(HUB_LABELS_MAGIC)
+        periods = [(period, graph.hub_labels) for period, graph in city_map.time.items()
+                   if graph.hub_labels is not None]
+        file.write(array('q', [_BYTE_ORDER_MARK, len(periods)]).tobytes())
+        for period, labels in periods:
+            encoded = [name.encode('utf-8') for name in [period] + labels.names]
+            string_offsets = array('q', [0])
+            for text in encoded:
+                string_offsets.append(string_offsets[-1] + len(text))
+            file.write(array('q', [len(labels.names), len(labels.out_hubs), len(labels.in_hubs),
+                                   int(labels.integral), *_weights_fingerprint(city_map.time[period])]).tobytes())
+            file.write(string_offsets.tobytes())
+            file.write(_padded(b"".join(encoded)))
+            for section in (labels.out_offsets, labels.out_hubs, labels.out_dists,
+                            labels.in_offsets, labels.in_hubs, labels.in_dists):
+                file.write(array(section.typecode, section).tobytes())
+
+def load_hub_labels(city_map, file_path):
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    if data[:8] != HUB_LABELS_MAGIC:
+        raise ValueError(f"{file_path} is not a hub label file")
+    position = 8
+
+    def take(count, typecode):
+        nonlocal position
+        values = array(typecode)
+        values.frombytes(data[position:position + count * 8])
+        position += count * 8
+        return values
+
+    byte_order_mark, period_count = take(2, 'q')
+    if byte_order_mark != _BYTE_ORDER_MARK:
+        raise ValueError(f"{file_path} was written on a machine with a different byte order")
+    # Every period is checked before any is installed, so a rejected file leaves the map untouched
+    loaded = []
+    for _ in range(period_count):
+        vertex_count, out_count, in_count, integral, edge_count, weights_hash = take(6, 'q')
+        string_offsets = take(vertex_count + 2, 'q')
+        strings = data[position:position + string_offsets[-1]]
+        position += string_offsets[-1] + (-string_offsets[-1] % 8)
+        period, *names = [strings[string_offsets[i]:string_offsets[i + 1]].decode('utf-8')
+                          for i in range(vertex_count + 1)]
+        labels = HubLabels(names, take(vertex_count + 1, 'q'), take(out_count, 'q'), take(out_count, 'd'),
+                           take(vertex_count + 1, 'q'), take(in_count, 'q'), take(in_count, 'd'), bool(integral))
+        graph = city_map.time.get(period)
+        if graph is None or set(graph.vertices) != set(names):
+            raise ValueError(f"Hub labels for period {period} do not match this City_Map")
+        if _weights_fingerprint(graph) != (edge_count, weights_hash):
+            raise ValueError(f"Hub labels for period {period} were built for different travel times")
+        loaded.append((graph, labels))
+    for graph, labels in loaded:
+        graph.hub_labels = labels
+
+def _weight_typecode(weights):
+    return 'q' if all(isinstance(weight, int) for weight in weights) else 'd'
+
+class CompiledGraph:
+    def __init__(self, names, offsets, targets, weights, integral, index=None):
+        self.names = names
+        self.index = index if index is not None else {name: i for i, name in enumerate(names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.integral = integral
+        self._unreached = array('d', [math.inf]) * len(self.names)
+        self._no_previous = array('q', [-1]) * len(self.names)
+
+    @classmethod
+    def from_graph(cls, graph):
+        names = list(graph.vertices)
+        index = {name: i for i, name in enumerate(names)}
+        offsets = array('q', [0])
+        targets = array('q')
+        edge_weights = []
+        for name in names:
+            for neighbor, weight in graph.vertices[name].connections.items():
+                targets.append(index[neighbor.name])
+                edge_weights.append(weight)
+            offsets.append(len(targets))
+        weights = array(_weight_typecode(edge_weights), edge_weights)
+        return cls(names, offsets, targets, weights, weights.typecode == 'q', index)
+
+    def __len__(self):
+        return len(self.names)
+
+    def new_buffers(self):
+        return array('d', self._unreached), array('q', self._no_previous)
+
+    def cost(self, distance):
+        # Distance buffers are doubles so they can hold inf; report integer weights as ints
+        if self.integral and distance != math.inf:
+            return int(distance)
+        return distance
 
-def find_shortest_path(city_map, start_street, end_street, time_period):
+    def set_weight(self, from_name, to_name, weight):
+        if self.weights.typecode == 'q' and not isinstance(weight, int):
+            return False
+        source, target = self.index[from_name], self.index[to_name]
+        for edge in range(self.offsets[source], self.offsets[source + 1]):
+            if self.targets[edge] == target:
+                self.weights[edge] = weight
+                return True
+        return False
+
+    def path_to(self, previous, target):
+        path = []
+        current = target
+        while current != -1:
+            path.append(self.names[current])
+            current = previous[current]
+        return path[::-1]
+
+def _csr_search(compiled, source, distances, previous=None, touched=None, closed_edges=None,
+                closed_vertices=None):
+    # The one CSR Dijkstra loop: yields (vertex, distance) as vertices settle, so callers stop
+    # early by breaking. Buffers belong to the caller; touched collects every labelled vertex so
+    # a shared buffer can be reset cheaply, and closed_* bytearrays mask edges or vertices out
+    offsets, targets, weights = compiled.offsets, compiled.targets, compiled.weights
+    distances[source] = 0
+    if touched is not None:
+        touched.append(source)
+    heap = [(0, source)]
+
+    while heap:
+        distance, current = heappop(heap)
+        if distance > distances[current]:
+            continue
+        yield current, distance
+
+        for edge in range(offsets[current], offsets[current + 1]):
+            if closed_edges is not None and closed_edges[edge]:
+                continue
+            neighbor = targets[edge]
+            if closed_vertices is not None and closed_vertices[neighbor]:
+                continue
+            candidate = distance + weights[edge]
+            if candidate < distances[neighbor]:
+                if touched is not None and distances[neighbor] == math.inf:
+                    touched.append(neighbor)
+                distances[neighbor] = candidate
+                if previous is not None:
+                    previous[neighbor] = current
+                heappush(heap, (candidate, neighbor))
+
+def compiled_dijkstra(compiled, source, target, closed_edges=None):
+    distances, previous = compiled.new_buffers()
+    for current, distance in _csr_search(compiled, source, distances, previous, closed_edges=closed_edges):
+        if current == target:
+            return compiled.path_to(previous, target), compiled.cost(distance)
+    return None, math.inf
+
+_arc_flag_graph = None
+
+def _init_arc_flag_worker(offsets, targets, weights, region):
+    # The reverse adjacency is built once per worker and shared by every region it processes
+    global _arc_flag_graph
+    sources = array('q', [0]) * len(targets)
+    reverse = [[] for _ in range(len(region))]
+    for vertex in range(len(region)):
+        for edge in range(offsets[vertex], offsets[vertex + 1]):
+            sources[edge] = vertex
+            reverse[targets[edge]].append(edge)
+    _arc_flag_graph = (targets, weights, region, sources, reverse)
+
+def _region_flags(region_id):
+    targets, weights, region, sources, reverse = _arc_flag_graph
+    count = len(region)
+
+    flagged = bytearray(len(targets))
+    boundary = []
+    for vertex in range(count):
+        if region[vertex] != region_id:
+            continue
+        for edge in reverse[vertex]:
+            if region[sources[edge]] == region_id:
+                flagged[edge] = 1
+            elif not boundary or boundary[-1] != vertex:
+                boundary.append(vertex)
+
+    # An edge leads toward the region if it lies on some shortest path into one of its entry vertices
+    for entry in boundary:
+        distances = array('d', [math.inf]) * count
+        distances[entry] = 0
+        heap = [(0, entry)]
+        while heap:
+            distance, current = heappop(heap)
+            if distance > distances[current]:
+                continue
+            for edge in reverse[current]:
+                neighbor = sources[edge]
+                candidate = distance + weights[edge]
+                if candidate < distances[neighbor]:
+                    distances[neighbor] = candidate
+                    heappush(heap, (candidate, neighbor))
+        for edge in range(len(targets)):
+            head_distance = distances[targets[edge]]
+            if head_distance != math.inf and distances[sources[edge]] == head_distance + weights[edge]:
+                flagged[edge] = 1
+    return bytes(flagged)
+
+def _partition(compiled, regions):
+    # Hop-distance Voronoi cells around farthest-point seeds; any partition keeps arc flags exact
+    count = len(compiled)
+    neighbors = [set() for _ in range(count)]
+    for vertex in range(count):
+        for edge in range(compiled.offsets[vertex], compiled.offsets[vertex + 1]):
+            neighbors[vertex].add(compiled.targets[edge])
+            neighbors[compiled.targets[edge]].add(vertex)
+
+    def hops_from(seeds):
+        hops = [-1] * count
+        owner = [-1] * count
+        frontier = list(seeds)
+        for region_id, seed in enumerate(seeds):
+            hops[seed], owner[seed] = 0, region_id
+        while frontier:
+            next_frontier = []
+            for vertex in frontier:
+                for neighbor in neighbors[vertex]:
+                    if hops[neighbor] == -1:
+                        hops[neighbor], owner[neighbor] = hops[vertex] + 1, owner[vertex]
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        return hops, owner
+
+    seeds = [0] if count else []
+    while len(seeds) < min(regions, count):
+        hops, _ = hops_from(seeds)
+        unreached = [vertex for vertex in range(count) if hops[vertex] == -1]
+        seeds.append(unreached[0] if unreached else max(range(count), key=hops.__getitem__))
+    _, owner = hops_from(seeds)
+    return array('q', [region_id if region_id != -1 else vertex % len(seeds) for vertex, region_id in enumerate(owner)])
+
+class ArcFlags:
+    def __init__(self, compiled, regions=8, workers=None):
+        if regions > 64:
+            raise ValueError("ArcFlags supports at most 64 regions")
+        self.region = _partition(compiled, regions)
+        self.flags = array('Q', [0]) * len(compiled.targets)
+        region_ids = sorted(set(self.region))
+        context = (compiled.offsets, compiled.targets, compiled.weights, self.region)
+        if workers is not None and workers > 1 and len(region_ids) > 1:
+            with ProcessPoolExecutor(workers, initializer=_init_arc_flag_worker, initargs=context) as pool:
+                masks = list(pool.map(_region_flags, region_ids))
+        else:
+            _init_arc_flag_worker(*context)
+            masks = [_region_flags(region_id) for region_id in region_ids]
+        for region_id, mask in zip(region_ids, masks):
+            bit = 1 << region_id
+            for edge, flagged in enumerate(mask):
+                if flagged:
+                    self.flags[edge] |= bit
+        self.closed = {}
+
+    def closed_edges(self, region_id):
+        # Edges a search towards this region may skip, as a mask for _csr_search
+        closed = self.closed.get(region_id)
+        if closed is None:
+            bit = 1 << region_id
+            closed = self.closed[region_id] = bytearray(not flag & bit for flag in self.flags)
+        return closed
+
+class AllPairs:
+    # Dense n x n distance and next-hop tables in row-major order; next_hop[i * n + j] is the
+    # street after i on a shortest i -> j path, or -1 when j is unreachable
+    def __init__(self, compiled):
+        self.names = compiled.names
+        self.index = compiled.index
+        self.size = len(compiled)
+        self.integral = compiled.integral
+        if np is not None:
+            self.distances, self.next_hop = self._floyd_warshall(compiled)
+        else:
+            self.distances, self.next_hop = self._repeated_dijkstra(compiled)
+
+    def _floyd_warshall(self, compiled):
+        n = self.size
+        distances = np.full((n, n), np.inf)
+        next_hop = np.full((n, n), -1, dtype=np.int64)
+        sources = np.repeat(np.arange(n), np.diff(np.asarray(compiled.offsets)))
+        targets = np.asarray(compiled.targets, dtype=np.int64)
+        weights = np.asarray(compiled.weights, dtype=np.float64)
+        np.minimum.at(distances, (sources, targets), weights)
+        next_hop[sources, targets] = targets
+        diagonal = np.arange(n)
+        distances[diagonal, diagonal] = 0
+        next_hop[diagonal, diagonal] = diagonal
+        for k in range(n):
+            through = distances[:, k, None] + distances[None, k, :]
+            better = through < distances
+            np.copyto(distances, through, where=better)
+            np.copyto(next_hop, np.broadcast_to(next_hop[:, k, None], (n, n)), where=better)
+        return distances.ravel(), next_hop.ravel()
+
+    def _repeated_dijkstra(self, compiled):
+        n = self.size
+        distances = array('d')
+        next_hop = array('q')
+        for source in range(n):
+            row, previous = compiled.new_buffers()
+            hops = array('q', [-1]) * n
+            # Settle order guarantees a vertex's predecessor already has its first hop
+            for vertex, _ in _csr_search(compiled, source, row, previous):
+                parent = previous[vertex]
+                hops[vertex] = vertex if parent in (-1, source) else hops[parent]
+            distances.extend(row)
+            next_hop.extend(hops)
+        return distances, next_hop
+
+    def distance(self, start_street, end_street):
+        distance = float(self.distances[self.index[start_street] * self.size + self.index[end_street]])
+        if self.integral and distance != math.inf:
+            return int(distance)
+        return distance
+
+    def path(self, start_street, end_street):
+        source, target = self.index[start_street], self.index[end_street]
+        if self.next_hop[source * self.size + target] == -1:
+            return None, math.inf
+        path = [start_street]
+        current = source
+        while current != target:
+            current = int(self.next_hop[current * self.size + target])
+            path.append(self.names[current])
+        return path, self.distance(start_street, end_street)
+
+def arc_flag_dijkstra(compiled, arc_flags, source, target):
+    return compiled_dijkstra(compiled, source, target, arc_flags.closed_edges(arc_flags.region[target]))
+
+def _edge_between(compiled, source, target):
+    for edge in range(compiled.offsets[source], compiled.offsets[source + 1]):
+        if compiled.targets[edge] == target:
+            return edge
+    return -1
+
+def _spur_search(compiled, source, target, distances, previous, blocked_vertices, blocked_edges):
+    touched = []
+    found = None
+    for current, _ in _csr_search(compiled, source, distances, previous, touched, blocked_edges, blocked_vertices):
+        if current == target:
+            found = []
+            while current != -1:
+                found.append(current)
+                current = previous[current]
+            found.reverse()
+            break
+
+    # Reset only what this search touched so the buffers can serve the next spur
+    for vertex in touched:
+        distances[vertex] = math.inf
+        previous[vertex] = -1
+    return found
+
+def k_shortest_paths(city_map, start_street, end_street, time_period, k):
+    if k <= 0 or time_period not in city_map.time:
+        return []
+    compiled = city_map.time[time_period].freeze()
+    if start_street not in compiled.index or end_street not in compiled.index:
+        return []
+    source, target = compiled.index[start_street], compiled.index[end_street]
+    distances, previous = compiled.new_buffers()
+    blocked_vertices = bytearray(len(compiled))
+    blocked_edges = bytearray(len(compiled.targets))
+    weights = compiled.weights
+
+    def path_edges(path):
+        return [_edge_between(compiled, u, v) for u, v in zip(path, path[1:])]
+
+    first = _spur_search(compiled, source, target, distances, previous, blocked_vertices, blocked_edges)
+    if first is None:
+        return []
+    accepted = [(sum(weights[edge] for edge in path_edges(first)), first)]
+    candidates = []
+    seen = {tuple(first)}
+
+    while len(accepted) < k:
+        _, last_path = accepted[-1]
+        last_edges = path_edges(last_path)
+        root_cost = 0
+        for i in range(len(last_path) - 1):
+            root = last_path[:i + 1]
+            removed_edges = [_edge_between(compiled, path[i], path[i + 1]) for _, path in accepted
+                             if path[:i + 1] == root and len(path) > i + 1]
+            for edge in removed_edges:
+                blocked_edges[edge] = 1
+            for vertex in root[:-1]:
+                blocked_vertices[vertex] = 1
+
+            spur = _spur_search(compiled, root[-1], target, distances, previous, blocked_vertices, blocked_edges)
+
+            for edge in removed_edges:
+                blocked_edges[edge] = 0
+            for vertex in root[:-1]:
+                blocked_vertices[vertex] = 0
+            if spur is not None:
+                path = root[:-1] + spur
+                key = tuple(path)
+                if key not in seen:
+                    seen.add(key)
+                    cost = root_cost + sum(weights[edge] for edge in path_edges(spur))
+                    heappush(candidates, (cost, key))
+            root_cost += weights[last_edges[i]]
+
+        if not candidates:
+            break
+        cost, key = heappop(candidates)
+        accepted.append((cost, list(key)))
+
+    return [([compiled.names[vertex] for vertex in path], compiled.cost(cost)) for cost, path in accepted]
+
+def travel_time_matrix(city_map, sources, targets, time_period):
+    matrix = [[math.inf] * len(targets) for _ in sources]
+    if time_period not in city_map.time:
+        return matrix
+
+    compiled = city_map.time[time_period].freeze()
+    target_columns = {}
+    for column, street in enumerate(targets):
+        if street in compiled.index:
+            target_columns.setdefault(compiled.index[street], []).append(column)
+    # One distance buffer shared by every source tree; only touched slots are reset
+    distances, _ = compiled.new_buffers()
+    touched = []
+
+    for row, street in enumerate(sources):
+        if street not in compiled.index or not target_columns:
+            continue
+        remaining = len(target_columns)
+        for current, distance in _csr_search(compiled, compiled.index[street], distances, touched=touched):
+            if current in target_columns:
+                for column in target_columns[current]:
+                    matrix[row][column] = compiled.cost(distance)
+                remaining -= 1
+                if not remaining:
+                    break
+
+        for vertex in touched:
+            distances[vertex] = math.inf
+        touched.clear()
+
+    return matrix
+
+def routes_from(city_map, start_street, end_streets, time_period):
+    routes = {street: (None, math.inf) for street in end_streets}
+    if time_period not in city_map.time:
+        return routes
+    compiled = city_map.time[time_period].freeze()
+    if start_street not in compiled.index:
+        return routes
+    # One single-source search serves every requested target; it stops once all are settled
+    wanted = {compiled.index[street]: street for street in routes if street in compiled.index}
+    if not wanted:
+        return routes
+    distances, previous = compiled.new_buffers()
+    for current, distance in _csr_search(compiled, compiled.index[start_street], distances, previous):
+        if current in wanted:
+            routes[wanted.pop(current)] = (compiled.path_to(previous, current), compiled.cost(distance))
+            if not wanted:
+                break
+
+    return routes
+
+_query_hook = None
+
+def set_query_hook(callback):
+    # callback(stats) runs after every find_shortest_path; pass None to switch instrumentation off
+    global _query_hook
+    _query_hook = callback
+
+def find_shortest_path(city_map, start_street, end_street, time_period, method="dijkstra", stats=None):
+    if stats is None and _query_hook is not None:
+        stats = QueryStats()
+    if stats is None:
+        return _find_shortest_path(city_map, start_street, end_street, time_period, method, None)
+
+    stats.method = method
+    stats.time_period = time_period
+    started = time.perf_counter()
+    result = _find_shortest_path(city_map, start_street, end_street, time_period, method, stats)
+    stats.phases["total"] = time.perf_counter() - started
+    stats.total_time = result[1]
+    if _query_hook is not None:
+        _query_hook(stats)
+    return result
+
+def _find_shortest_path(city_map, start_street, end_street, time_period, method, stats):
     if time_period not in city_map.time:
         return None, math.inf
     
@@ -85,40 +1516,904 @@ def find_shortest_path(city_map, start_street, end_street, time_period):
     if start_street not in graph.vertices or end_street not in graph.vertices:
         return None, math.inf
     
+    if stats is not None:
+        started = time.perf_counter()
+    if method == "ch":
+        hierarchy = graph.hierarchy
+        if hierarchy is None:
+            hierarchy = graph.hierarchy = ContractionHierarchy(graph)
+    elif method == "bidirectional":
+        graph.reverse_connections()
+    elif method == "alt":
+        if graph.landmarks is None:
+            graph.landmarks = Landmarks(graph)
+    elif method == "compiled":
+        compiled = graph.freeze()
+    elif method == "arcflags":
+        compiled = graph.freeze()
+        arc_flags = graph.arc_flags
+        if arc_flags is None:
+            arc_flags = graph.arc_flags = ArcFlags(compiled)
+    elif method == "apsp":
+        compiled = graph.freeze()
+        all_pairs = graph.all_pairs
+        if all_pairs is None and len(graph.vertices) <= ALL_PAIRS_MAX_VERTICES:
+            all_pairs = graph.all_pairs = AllPairs(compiled)
+    elif method != "dijkstra":
+        raise ValueError(f"Unknown routing method: {method}")
+    if stats is not None:
+        stats.phases["preprocess"] = time.perf_counter() - started
+
     start_vertex = graph.vertices[start_street]
     end_vertex = graph.vertices[end_street]
     
-    return dijkstra(graph, start_vertex, end_vertex)
+    if method == "dijkstra":
+        return dijkstra(graph, start_vertex, end_vertex, stats)
+    if method == "ch":
+        search = partial(hierarchy.query, start_street, end_street)
+    elif method == "bidirectional":
+        search = partial(bidirectional_dijkstra, graph, start_vertex, end_vertex)
+    elif method == "alt":
+        search = partial(alt_search, graph, start_vertex, end_vertex)
+    elif method == "apsp" and all_pairs is not None:
+        search = partial(all_pairs.path, start_street, end_street)
+    elif method in ("compiled", "apsp"):
+        search = partial(compiled_dijkstra, compiled, compiled.index[start_street], compiled.index[end_street])
+    else:
+        search = partial(arc_flag_dijkstra, compiled, arc_flags,
+                         compiled.index[start_street], compiled.index[end_street])
+    if stats is None:
+        return search()
+
+    # Only plain dijkstra counts its work; other engines report timings and leave the counters
+    # as None so they cannot be mistaken for a search that settled nothing
+    stats.settled = stats.relaxed = stats.pushes = stats.stale_pops = stats.peak_queue = None
+    searching = time.perf_counter()
+    result = search()
+    stats.phases["search"] = time.perf_counter() - searching
+    return result
+
+MINUTES_PER_DAY = 24 * 60
+
+def period_minutes(time_period):
+    if isinstance(time_period, str):
+        time_period = int(time_period[:-2] or 0) * 60 + int(time_period[-2:])
+    return time_period % MINUTES_PER_DAY
+
+class TimeDependentGraph:
+    def __init__(self, city_map):
+        self.signature = None
+        periods = sorted(city_map.time, key=period_minutes)
+        for earlier, later in zip(periods, periods[1:]):
+            if period_minutes(earlier) == period_minutes(later):
+                raise ValueError(f"Time periods {earlier!r} and {later!r} fall on the same minute of the day")
+        snapshots = [(period_minutes(period), city_map.time[period]) for period in periods]
+        profiles = {}
+        for i, (minute, graph) in enumerate(snapshots):
+            for vertex in graph.vertices.values():
+                streets = profiles.setdefault(vertex.name, {})
+                for neighbor, travel_time in vertex.connections.items():
+                    streets.setdefault(neighbor.name, [math.inf] * len(snapshots))[i] = travel_time
+                for neighbor in vertex.connections:
+                    profiles.setdefault(neighbor.name, {})
+
+        # Every edge shares the snapshot minutes, padded one day either side so lookups wrap midnight
+        minutes = [minute for minute, _ in snapshots]
+        if minutes:
+            minutes = [minutes[-1] - MINUTES_PER_DAY] + minutes + [minutes[0] + MINUTES_PER_DAY]
+        self.break_times = array('d', minutes)
+        self.stride = len(minutes)
+        self.names = list(profiles)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.offsets = array('q', [0])
+        self.targets = array('q')
+        # Edge e's costs at each breakpoint are break_costs[e * stride:(e + 1) * stride]; inf marks a closure
+        self.break_costs = array('d')
+        for name in self.names:
+            for neighbor, costs in profiles[name].items():
+                self.targets.append(self.index[neighbor])
+                self.break_costs.extend([costs[-1]] + costs + [costs[0]])
+            self.offsets.append(len(self.targets))
+
+    def edge_cost(self, edge, minute):
+        # A street missing from a snapshot is closed for the half of each neighbouring interval nearest
+        # it. Reaching a closed street means waiting for it to reopen, which keeps arrivals FIFO
+        times = self.break_times
+        clock = minute % MINUTES_PER_DAY
+        i = bisect_right(times, clock) - 1
+        waited = 0
+        for _ in range(self.stride):
+            base = edge * self.stride + i
+            left, right = self.break_costs[base], self.break_costs[base + 1]
+            middle = (times[i] + times[i + 1]) / 2
+            if left != math.inf and right != math.inf:
+                fraction = (clock - times[i]) / (times[i + 1] - times[i])
+                return waited + left + fraction * (right - left)
+            if left == math.inf and right != math.inf:
+                return waited + max(middle - clock, 0) + right
+            if left != math.inf and clock < middle:
+                return waited + left
+            # Closed for the rest of this interval; the padded last breakpoint wraps to the first real one
+            waited += times[i + 1] - clock
+            i += 1
+            if i == self.stride - 1:
+                i = 1
+            clock = times[i]
+        return math.inf
+
+def find_time_dependent_path(city_map, start_street, end_street, departure):
+    td_graph = city_map.time_dependent_graph()
+    if start_street not in td_graph.index or end_street not in td_graph.index:
+        return None, math.inf
+    source = td_graph.index[start_street]
+    target = td_graph.index[end_street]
+    start_time = period_minutes(departure)
+
+    # Earliest-arrival Dijkstra: labels are arrival times, valid while edges stay FIFO
+    arrivals = array('d', [math.inf]) * len(td_graph.names)
+    previous = array('q', [-1]) * len(td_graph.names)
+    arrivals[source] = start_time
+    heap = [(start_time, source)]
+    offsets, targets = td_graph.offsets, td_graph.targets
+
+    while heap:
+        arrival, current = heappop(heap)
+        if arrival > arrivals[current]:
+            continue
+        if current == target:
+            path = []
+            while current != -1:
+                path.append(td_graph.names[current])
+                current = previous[current]
+            return path[::-1], arrival - start_time
+
+        for edge in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[edge]
+            candidate = arrival + td_graph.edge_cost(edge, arrival)
+            if candidate < arrivals[neighbor]:
+                arrivals[neighbor] = candidate
+                previous[neighbor] = current
+                heappush(heap, (candidate, neighbor))
+
+    return None, math.inf
+
+class SharedTopologyMap:
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.offsets = array('q', [0])
+        self.targets = array('q')
+        self._edge_index = {}
+        self.weights = {}
+        self.integral = {}
+        # present[period][v] is 1 when street v exists in that period, as a City_Map vertex would
+        self.present = {}
+        self.hierarchy = None
+        self.metrics = {}
+        self.compiled = {}
+        self.profiles = {}
+        self.snapshot = None
+        self.signature = None
+
+    @classmethod
+    def from_city_map(cls, city_map):
+        shared = cls()
+        periods = _city_data(city_map)
+        shared._build_topology(periods.values())
+        for time_period, streets in periods.items():
+            shared.add_period(time_period, streets)
+        return shared
+
+    @property
+    def edge_index(self):
+        # Snapshots only map the CSR arrays; the name lookup is built the first time it is needed
+        if self._edge_index is None:
+            self._edge_index = {
+                name: {self.names[self.targets[edge]]: edge
+                       for edge in range(self.offsets[vertex], self.offsets[vertex + 1])}
+                for vertex, name in enumerate(self.names)
+            }
+        return self._edge_index
+
+    def _build_topology(self, periods):
+        adjacency = {name: set() for name in self.names}
+        for from_name, edges in self.edge_index.items():
+            adjacency[from_name].update(edges)
+        for streets in periods:
+            for from_street, connections in streets.items():
+                adjacency.setdefault(from_street, set()).update(connections)
+                for to_street in connections:
+                    adjacency.setdefault(to_street, set())
+
+        old_edges = [(from_name, to_name, edge) for from_name, edges in self.edge_index.items()
+                     for to_name, edge in edges.items()]
+        old_names = self.names
+        self.names = list(adjacency)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.offsets = array('q', [0])
+        self.targets = array('q')
+        self._edge_index = {}
+        for name in self.names:
+            edges = self._edge_index.setdefault(name, {})
+            for to_name in sorted(adjacency[name]):
+                edges[to_name] = len(self.targets)
+                self.targets.append(self.index[to_name])
+            self.offsets.append(len(self.targets))
+
+        # Carry existing weight vectors over to the new edge numbering
+        for time_period, old_weights in self.weights.items():
+            weights = array('d', [math.inf]) * len(self.targets)
+            for from_name, to_name, edge in old_edges:
+                weights[self.edge_index[from_name][to_name]] = old_weights[edge]
+            self.weights[time_period] = weights
+        for time_period, old_present in self.present.items():
+            present = bytearray(len(self.names))
+            for vertex, name in enumerate(old_names):
+                present[self.index[name]] = old_present[vertex]
+            self.present[time_period] = present
+        self.hierarchy = None
+        self.metrics.clear()
+        self.compiled.clear()
+        self.profiles.clear()
+
+    def add_period(self, time_period, streets):
+        for from_street, connections in streets.items():
+            known = self.edge_index.get(from_street)
+            if known is None or any(to_street not in known for to_street in connections):
+                self._build_topology([streets])
+                break
+        weights = array('d', [math.inf]) * len(self.targets)
+        present = bytearray(len(self.names))
+        integral = True
+        for from_street, connections in streets.items():
+            edges = self.edge_index[from_street]
+            present[self.index[from_street]] = 1
+            for to_street, travel_time in connections.items():
+                weights[edges[to_street]] = travel_time
+                present[self.index[to_street]] = 1
+                integral = integral and isinstance(travel_time, int)
+        self.weights[time_period] = weights
+        self.integral[time_period] = integral
+        self.present[time_period] = present
+        self.metrics.pop(time_period, None)
+        self.compiled.pop(time_period, None)
+        self.profiles.clear()
+
+    def has_street(self, time_period, street):
+        return street in self.index and bool(self.present[time_period][self.index[street]])
+
+    def compiled_period(self, time_period):
+        if time_period not in self.compiled:
+            self.compiled[time_period] = CompiledGraph(self.names, self.offsets, self.targets,
+                                                       self.weights[time_period], self.integral[time_period],
+                                                       self.index)
+        return self.compiled[time_period]
+
+    def profile_weights(self, periods):
+        # Edge-major cost table: edge e's cost in each period is [e * len(periods):(e + 1) * len(periods)]
+        periods = tuple(periods)
+        if periods not in self.profiles:
+            columns = [self.weights[period] for period in periods]
+            table = array('d', [math.inf]) * (len(self.targets) * len(periods))
+            for column, weights in enumerate(columns):
+                table[column::len(periods)] = array('d', weights)
+            self.profiles[periods] = table
+        return self.profiles[periods]
 
-def load_city_data(file_path):
+    def customizable_hierarchy(self):
+        if self.hierarchy is None:
+            self.hierarchy = CustomizableHierarchy(self)
+        return self.hierarchy
+
+    def metric(self, time_period):
+        if time_period not in self.metrics:
+            self.metrics[time_period] = self.customizable_hierarchy().customize(self.weights[time_period])
+        return self.metrics[time_period]
+
+    def find_shortest_path(self, start_street, end_street, time_period, method="cch"):
+        if time_period not in self.weights:
+            return None, math.inf
+        if not self.has_street(time_period, start_street) or not self.has_street(time_period, end_street):
+            return None, math.inf
+        # There are no per-period Graphs here, so plain Dijkstra runs on the period's CSR arrays
+        if method in ("compiled", "dijkstra"):
+            return compiled_dijkstra(self.compiled_period(time_period),
+                                     self.index[start_street], self.index[end_street])
+        if method != "cch":
+            raise ValueError(f"Unknown routing method: {method}")
+        path, total_time = self.customizable_hierarchy().query(
+            self.metric(time_period), self.index[start_street], self.index[end_street])
+        if path is None:
+            return None, math.inf
+        if self.integral[time_period]:
+            total_time = int(total_time)
+        return [self.names[vertex] for vertex in path], total_time
+
+SNAPSHOT_MAGIC = b"PYLSNAP2"
+_BYTE_ORDER_MARK = 0x0102030405060708
+
+def _padded(data):
+    return data + b"\0" * (-len(data) % 8)
+
+def save_snapshot(city_map, file_path):
+    shared = city_map if isinstance(city_map, SharedTopologyMap) else SharedTopologyMap.from_city_map(city_map)
+    periods = list(shared.weights)
+    encoded = [name.encode('utf-8') for name in itertools.chain(shared.names, periods)]
+    string_offsets = array('q', [0])
+    for text in encoded:
+        string_offsets.append(string_offsets[-1] + len(text))
+    strings = b"".join(encoded)
+    header = array('q', [_BYTE_ORDER_MARK, len(shared.names), len(shared.targets), len(periods), len(strings)])
+    flags = array('q', [int(shared.integral[period]) for period in periods])
+
+    with open(file_path, 'wb') as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(header.tobytes())
+        file.write(string_offsets.tobytes())
+        file.write(_padded(strings))
+        file.write(array('q', shared.offsets).tobytes())
+        file.write(array('q', shared.targets).tobytes())
+        file.write(flags.tobytes())
+        for period in periods:
+            file.write(_padded(bytes(shared.present[period])))
+        for period in periods:
+            file.write(array('d', shared.weights[period]).tobytes())
+
+def open_snapshot(file_path):
+    with open(file_path, 'rb') as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    if bytes(view[:8]) != SNAPSHOT_MAGIC:
+        raise ValueError(f"{file_path} is not a City_Map snapshot")
+    header = view[8:48].cast('q')
+    if header[0] != _BYTE_ORDER_MARK:
+        raise ValueError(f"{file_path} was written on a machine with a different byte order")
+    vertex_count, edge_count, period_count, string_size = header[1:5]
+
+    def take(position, count, typecode):
+        end = position + count * 8
+        return view[position:end].cast(typecode), end
+
+    string_offsets, position = take(48, vertex_count + period_count + 1, 'q')
+    strings = view[position:position + string_size]
+    position += string_size + (-string_size % 8)
+    labels = [str(strings[string_offsets[i]:string_offsets[i + 1]], 'utf-8')
+              for i in range(vertex_count + period_count)]
+
+    shared = SharedTopologyMap()
+    shared.snapshot = mapped
+    shared.names = labels[:vertex_count]
+    shared.index = {name: i for i, name in enumerate(shared.names)}
+    shared.offsets, position = take(position, vertex_count + 1, 'q')
+    shared.targets, position = take(position, edge_count, 'q')
+    shared._edge_index = None
+    flags, position = take(position, period_count, 'q')
+    for period in labels[vertex_count:]:
+        shared.present[period] = view[position:position + vertex_count]
+        position += vertex_count + (-vertex_count % 8)
+    for i, period in enumerate(labels[vertex_count:]):
+        shared.weights[period], position = take(position, edge_count, 'd')
+        shared.integral[period] = bool(flags[i])
+    return shared
+
+class CustomizableHierarchy:
+    # Metric-independent contraction: the order and shortcut topology depend only on the street
+    # layout, so each period's weights are applied by a cheap triangle-relaxation customization
+    def __init__(self, topology):
+        count = len(topology.names)
+        neighbors = [set() for _ in range(count)]
+        for vertex in range(count):
+            for edge in range(topology.offsets[vertex], topology.offsets[vertex + 1]):
+                target = topology.targets[edge]
+                if target != vertex:
+                    neighbors[vertex].add(target)
+                    neighbors[target].add(vertex)
+
+        # Minimum-degree elimination order; eliminated vertices' neighbors become cliques
+        self.rank = [0] * count
+        upward = [None] * count
+        heap = [(len(neighbors[vertex]), vertex) for vertex in range(count)]
+        heapify(heap)
+        eliminated = 0
+        while heap:
+            degree, vertex = heappop(heap)
+            if upward[vertex] is not None or degree != len(neighbors[vertex]):
+                continue
+            self.rank[vertex] = eliminated
+            eliminated += 1
+            upward[vertex] = list(neighbors[vertex])
+            for u in upward[vertex]:
+                neighbors[u].discard(vertex)
+                neighbors[u].update(w for w in upward[vertex] if w != u)
+                heappush(heap, (len(neighbors[u]), u))
+
+        self.arc_id = {}
+        self.up_offsets = array('q', [0])
+        self.up_heads = array('q')
+        for vertex in range(count):
+            upward[vertex].sort(key=lambda u: self.rank[u])
+            for u in upward[vertex]:
+                self.arc_id[(vertex, u)] = len(self.up_heads)
+                self.up_heads.append(u)
+            self.up_offsets.append(len(self.up_heads))
+
+        # Lower triangles {v, u, w} with v lowest, listed in rank order of v
+        self.triangles = []
+        for vertex in sorted(range(count), key=lambda v: self.rank[v]):
+            heads = upward[vertex]
+            for i, u in enumerate(heads):
+                for w in heads[i + 1:]:
+                    self.triangles.append((self.arc_id[(u, w)], self.arc_id[(vertex, u)],
+                                           self.arc_id[(vertex, w)], vertex))
+
+        self.input_arcs = []
+        for vertex in range(count):
+            for edge in range(topology.offsets[vertex], topology.offsets[vertex + 1]):
+                target = topology.targets[edge]
+                if target == vertex:
+                    continue
+                if self.rank[vertex] < self.rank[target]:
+                    self.input_arcs.append((edge, self.arc_id[(vertex, target)], True))
+                else:
+                    self.input_arcs.append((edge, self.arc_id[(target, vertex)], False))
+
+    def customize(self, weights):
+        arcs = len(self.up_heads)
+        up = array('d', [math.inf]) * arcs
+        down = array('d', [math.inf]) * arcs
+        up_middle = array('q', [-1]) * arcs
+        down_middle = array('q', [-1]) * arcs
+        for edge, arc, upward in self.input_arcs:
+            if upward:
+                up[arc] = min(up[arc], weights[edge])
+            else:
+                down[arc] = min(down[arc], weights[edge])
+
+        for arc, low_u, low_w, vertex in self.triangles:
+            # u -> v -> w improves the upward direction, w -> v -> u the downward one
+            through = down[low_u] + up[low_w]
+            if through < up[arc]:
+                up[arc] = through
+                up_middle[arc] = vertex
+            through = down[low_w] + up[low_u]
+            if through < down[arc]:
+                down[arc] = through
+                down_middle[arc] = vertex
+        return up, down, up_middle, down_middle
+
+    def query(self, metric, source, target):
+        up, down, up_middle, down_middle = metric
+        forward = {source: (0, None)}
+        backward = {target: (0, None)}
+        heaps = ([(0, source)], [(0, target)])
+        best = math.inf
+        meeting = None
+
+        while heaps[0] or heaps[1]:
+            for heap, labels, other, costs in ((heaps[0], forward, backward, up),
+                                               (heaps[1], backward, forward, down)):
+                if not heap:
+                    continue
+                distance, current = heappop(heap)
+                if distance > labels[current][0]:
+                    continue
+                if distance >= best:
+                    heap.clear()
+                    continue
+                if current in other and distance + other[current][0] < best:
+                    best = distance + other[current][0]
+                    meeting = current
+                for arc in range(self.up_offsets[current], self.up_offsets[current + 1]):
+                    candidate = distance + costs[arc]
+                    head = self.up_heads[arc]
+                    if candidate < labels.get(head, (math.inf,))[0]:
+                        labels[head] = (candidate, current)
+                        heappush(heap, (candidate, head))
+
+        if meeting is None:
+            return None, math.inf
+
+        chain = []
+        current = meeting
+        while current is not None:
+            chain.append(current)
+            current = forward[current][1]
+        chain.reverse()
+        current = backward[meeting][1]
+        while current is not None:
+            chain.append(current)
+            current = backward[current][1]
+
+        path = [chain[0]]
+        for u, w in zip(chain, chain[1:]):
+            self._unpack(u, w, up_middle, down_middle, path)
+        return path, best
+
+    def _unpack(self, u, w, up_middle, down_middle, path):
+        stack = [(u, w)]
+        while stack:
+            u, w = stack.pop()
+            if self.rank[u] < self.rank[w]:
+                middle = up_middle[self.arc_id[(u, w)]]
+            else:
+                middle = down_middle[self.arc_id[(w, u)]]
+            if middle == -1:
+                path.append(w)
+            else:
+                stack.append((middle, w))
+                stack.append((u, middle))
+
+def profile_query(city_map, start_street, end_street, periods=None):
+    shared = city_map.shared_topology() if isinstance(city_map, City_Map) else city_map
+    periods = [period for period in (periods if periods is not None else shared.weights) if period in shared.weights]
+    results = {period: (None, math.inf) for period in periods}
+    if not periods or start_street not in shared.index or end_street not in shared.index:
+        return results
+
+    # One search carries a travel-time vector per vertex, so each edge scan serves every period.
+    # It is label-correcting: a vertex is rescanned only for the periods that improved since its last scan
+    width = len(periods)
+    table = shared.profile_weights(periods)
+    offsets, targets = shared.offsets, shared.targets
+    source, target = shared.index[start_street], shared.index[end_street]
+    distances = array('d', [math.inf]) * (len(shared.names) * width)
+    previous = array('q', [-1]) * (len(shared.names) * width)
+    pending = {source: set(range(width))}
+    for column in range(width):
+        distances[source * width + column] = 0
+    heap = [(0, source)]
+    target_base = target * width
+
+    while heap:
+        key, current = heappop(heap)
+        if key >= max(distances[target_base:target_base + width]):
+            break
+        columns = pending.pop(current, None)
+        if not columns:
+            continue
+        base = current * width
+        for edge in range(offsets[current], offsets[current + 1]):
+            neighbor_base = targets[edge] * width
+            improved = None
+            for column in columns:
+                candidate = distances[base + column] + table[edge * width + column]
+                if candidate < distances[neighbor_base + column] and candidate < distances[target_base + column]:
+                    distances[neighbor_base + column] = candidate
+                    previous[neighbor_base + column] = current
+                    improved = candidate if improved is None else min(improved, candidate)
+                    pending.setdefault(targets[edge], set()).add(column)
+            if improved is not None:
+                heappush(heap, (improved, targets[edge]))
+
+    for column, period in enumerate(periods):
+        total_time = distances[target_base + column]
+        if total_time == math.inf:
+            continue
+        if not shared.has_street(period, start_street) or not shared.has_street(period, end_street):
+            continue
+        path = []
+        current = target
+        while current != -1:
+            path.append(shared.names[current])
+            current = previous[current * width + column]
+        results[period] = (path[::-1], int(total_time) if shared.integral[period] else total_time)
+    return results
+
+class RouteCache:
+    def __init__(self, city_map, maxsize=1024, ttl=None, method="dijkstra"):
+        self.city_map = city_map
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.method = method
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def find_shortest_path(self, start_street, end_street, time_period):
+        key = (time_period, start_street, end_street)
+        graph = self.city_map.time.get(time_period)
+        version = graph.version if graph is not None else None
+        entry = self.entries.get(key)
+        if entry is not None:
+            cached_version, expires, path, total_time = entry
+            if cached_version == version and (expires is None or time.monotonic() < expires):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return (list(path) if path else path), total_time
+            del self.entries[key]
+            self.invalidations += 1
+
+        self.misses += 1
+        path, total_time = find_shortest_path(self.city_map, start_street, end_street,
+                                              time_period, self.method)
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        self.entries[key] = (version, expires, path, total_time)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return (list(path) if path else path), total_time
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "size": len(self.entries),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+class _JsonStream:
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Drop consumed text so the buffer never holds more than the value being parsed
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        if not chunk:
+            self.eof = True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ""
+            self._fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of traffic data")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def members(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+def _stream_streets(stream):
+    for from_street in stream.members():
+        yield from_street, stream.value()
+
+def stream_city_data(file_path, periods=None, chunk_size=65536):
+    wanted = set(periods) if periods is not None else None
     with open(file_path, 'r') as file:
-        data = json.load(file)
-    
+        stream = _JsonStream(file, chunk_size)
+        for time_period in stream.members():
+            streets = _stream_streets(stream)
+            if wanted is None or time_period in wanted:
+                yield time_period, streets
+            # Skip whatever the caller left unread so the next period starts cleanly
+            for _ in streets:
+                pass
+
+def load_city_data(file_path, periods=None):
     city_map = City_Map()
     
-    for time_period, streets in data.items():
+    for time_period, streets in stream_city_data(file_path, periods):
         graph = city_map.add_times(time_period)
         
-        for from_street, connections in streets.items():
+        for from_street, connections in streets:
             for to_street, travel_time in connections.items():
                 graph.add_edge(from_street, to_street, travel_time)
     
     return city_map
 
-# Usage
-city_map = load_city_data('traffic_routes.json')
+def _city_data(city_map):
+    # Plain {period: {street: {street: travel time}}} form, as in traffic_routes.json
+    return {
+        time_period: {vertex.name: {neighbor.name: travel_time for neighbor, travel_time in vertex.connections.items()}
+                      for vertex in graph.vertices.values()}
+        for time_period, graph in city_map.time.items()
+    }
+
+def _city_map_from_data(data):
+    city_map = City_Map()
+    for time_period, streets in data.items():
+        graph = city_map.add_times(time_period)
+        for from_street, connections in streets.items():
+            graph.add_vertex(from_street)
+            for to_street, travel_time in connections.items():
+                graph.add_edge(from_street, to_street, travel_time)
+    return city_map
+
+def load_shared_topology(file_path, periods=None):
+    # Each streamed period becomes one weight vector on the shared CSR arrays; no per-period
+    # Graph is built, so memory grows by one float per edge per period instead of a full graph
+    shared = SharedTopologyMap()
+    for time_period, streets in stream_city_data(file_path, periods):
+        # As in load_city_data, a street only exists in a period through one of its connections
+        shared.add_period(time_period, {from_street: connections for from_street, connections in streets
+                                        if connections})
+    return shared
+
+def prepare_routing(city_map, method="dijkstra"):
+    # Build lazy indexes up front so pool workers only ever read shared structures
+    for graph in city_map.time.values():
+        if method == "compiled":
+            graph.freeze()
+        elif method == "bidirectional":
+            graph.reverse_connections()
+        elif method == "alt" and graph.landmarks is None:
+            graph.landmarks = Landmarks(graph)
+        elif method == "ch" and graph.hierarchy is None:
+            graph.hierarchy = ContractionHierarchy(graph)
+        elif method == "arcflags" and graph.arc_flags is None:
+            graph.arc_flags = ArcFlags(graph.freeze())
+        elif method == "apsp":
+            graph.freeze()
+            if graph.all_pairs is None and len(graph.vertices) <= ALL_PAIRS_MAX_VERTICES:
+                graph.all_pairs = AllPairs(graph.freeze())
+
+_worker_city_map = None
+
+def _init_route_worker(loader, loader_args):
+    global _worker_city_map
+    _worker_city_map = loader(*loader_args)
+
+def _route_batch(city_map, method, queries):
+    if isinstance(city_map, SharedTopologyMap):
+        return [city_map.find_shortest_path(start_street, end_street, time_period, method)
+                for start_street, end_street, time_period in queries]
+    return [find_shortest_path(city_map, start_street, end_street, time_period, method)
+            for start_street, end_street, time_period in queries]
+
+def _route_in_worker(method, queries):
+    return _route_batch(_worker_city_map, method, queries)
+
+class RoutingPool:
+    def __init__(self, city_map=None, workers=None, method="dijkstra", processes=False,
+                 loader=None, loader_args=()):
+        self.city_map = city_map
+        self.method = method
+        self.processes = processes
+        if processes:
+            # Each process builds its own City_Map once from the plain nested-dict form, since
+            # pickling the Vertex graph recurses once per street under the spawn start method.
+            # A loader such as open_snapshot lets workers share one page-cache copy instead
+            if loader is None:
+                loader, loader_args = _city_map_from_data, (_city_data(city_map),)
+            self.executor = ProcessPoolExecutor(workers, initializer=_init_route_worker,
+                                                initargs=(loader, loader_args))
+        else:
+            prepare_routing(city_map, method)
+            self.executor = ThreadPoolExecutor(workers)
+
+    def submit(self, start_street, end_street, time_period):
+        if self.processes:
+            future = self.executor.submit(_route_in_worker, self.method, [(start_street, end_street, time_period)])
+            return _first_result(future)
+        return self.executor.submit(find_shortest_path, self.city_map, start_street, end_street,
+                                    time_period, self.method)
+
+    def map(self, queries, chunksize=64):
+        queries = iter(queries)
+        batches = iter(lambda: list(itertools.islice(queries, chunksize)), [])
+        if self.processes:
+            for results in self.executor.map(_route_in_worker, itertools.repeat(self.method), batches):
+                yield from results
+        else:
+            routes = partial(_route_batch, self.city_map, self.method)
+            for results in self.executor.map(routes, batches):
+                yield from results
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def _first_result(future):
+    result = Future()
+
+    def unwrap(done):
+        if done.exception() is not None:
+            result.set_exception(done.exception())
+        else:
+            result.set_result(done.result()[0])
+
+    future.add_done_callback(unwrap)
+    return result
+
+DEFAULT_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traffic_routes.json')
+
+def read_queries(lines):
+    for row in csv.reader(lines):
+        if not row or row[0].startswith('#'):
+            continue
+        if len(row) != 3:
+            raise ValueError(f"Expected 'start,end,period' but got {row!r}")
+        yield tuple(field.strip() for field in row)
+
+def run_batch(city_map, queries, output, method="dijkstra", cache_size=4096):
+    cache = RouteCache(city_map, maxsize=cache_size, method=method)
+    count = 0
+    for start_street, end_street, time_period in queries:
+        path, total_time = cache.find_shortest_path(start_street, end_street, time_period)
+        output.write(json.dumps({
+            "start": start_street,
+            "end": end_street,
+            "period": time_period,
+            "path": path,
+            "total_time": total_time if path else None,
+        }) + "\n")
+        count += 1
+    output.flush()
+    return count, cache.stats()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pylandia traffic routing")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="traffic routes JSON file")
+    parser.add_argument('--batch', nargs='?', const='-', metavar='QUERIES',
+                        help="answer 'start,end,period' CSV queries from a file or stdin as JSON lines")
+    parser.add_argument('--method', default="dijkstra",
+                        choices=["dijkstra", "bidirectional", "alt", "ch", "compiled", "arcflags", "apsp"])
+    parser.add_argument('--cache-size', type=int, default=4096)
+    args = parser.parse_args(argv)
+
+    city_map = load_city_data(args.data)
+
+    if args.batch is not None:
+        if args.batch == '-':
+            count, stats = run_batch(city_map, read_queries(sys.stdin), sys.stdout, args.method, args.cache_size)
+        else:
+            with open(args.batch, 'r', newline='') as queries:
+                count, stats = run_batch(city_map, read_queries(queries), sys.stdout, args.method, args.cache_size)
+        print(f"Answered {count} queries ({stats['hits']} cache hits)", file=sys.stderr)
+        return
 
-# Example: Find the shortest path between two streets at a specific time
-start_street = "Snake Loop"
-end_street = "Debug Drive"
-time_period = "0800"
+    # Example: Find the shortest path between two streets at a specific time
+    start_street = "Snake Loop"
+    end_street = "Debug Drive"
+    time_period = "0800"
 
-path, total_time = find_shortest_path(city_map, start_street, end_street, time_period)
+    path, total_time = find_shortest_path(city_map, start_street, end_street, time_period, args.method)
 
-if path:
-    print(f"Shortest path from {start_street} to {end_street} at {time_period}:")
-    print(" -> ".join(path))
-    print(f"Total travel time: {total_time} minutes")
-else:
-    print(f"No path found from {start_street} to {end_street} at {time_period}")
+    if path:
+        print(f"Shortest path from {start_street} to {end_street} at {time_period}:")
+        print(" -> ".join(path))
+        print(f"Total travel time: {total_time} minutes")
+    else:
+        print(f"No path found from {start_street} to {end_street} at {time_period}")
 
+if __name__ == "__main__":
+    main()
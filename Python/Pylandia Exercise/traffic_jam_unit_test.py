@@ -0,0 +1,84 @@
+import math
+import os
+import tempfile
+import unittest
+
+import traffic_jam as tj
+
+class DijkstraQueueTest(unittest.TestCase):
+    def graph(self, travel_times):
+        graph = tj.Graph()
+        for (from_name, to_name), travel_time in zip((("A", "B"), ("B", "C"), ("A", "C")), travel_times):
+            graph.add_edge(from_name, to_name, travel_time)
+        return graph
+
+    def test_queues_agree(self):
+        for travel_times in ((2, 3, 7), (1.5, 2.25, 4.0)):
+            graph = self.graph(travel_times)
+            for queue in (tj.PriorityQueue, tj.IndexedPriorityQueue, tj.RadixHeap):
+                path, total_time = tj.dijkstra(graph, graph.vertices["A"], graph.vertices["C"], queue=queue)
+                self.assertEqual(path, ["A", "B", "C"])
+                self.assertEqual(total_time, travel_times[0] + travel_times[1])
+
+class AllPairsLimitTest(unittest.TestCase):
+    def test_large_period_routes_without_tables(self):
+        city_map = tj.City_Map()
+        graph = city_map.add_times("0800")
+        graph.add_edge("A", "B", 2)
+        graph.add_edge("B", "C", 3)
+        limit = tj.ALL_PAIRS_MAX_VERTICES
+        tj.ALL_PAIRS_MAX_VERTICES = 2
+        self.addCleanup(setattr, tj, "ALL_PAIRS_MAX_VERTICES", limit)
+        tj.prepare_routing(city_map, "apsp")
+        self.assertEqual(tj.find_shortest_path(city_map, "A", "C", "0800", "apsp"), (["A", "B", "C"], 5))
+        self.assertIsNone(graph.all_pairs)
+
+class SharedTopologyTest(unittest.TestCase):
+    def test_street_absent_from_period(self):
+        # Shipped data: Debug Drive has no connections in period 2400
+        city_map = tj.load_city_data(tj.DEFAULT_DATA_PATH)
+        self.assertEqual(tj.find_shortest_path(city_map, "Debug Drive", "Debug Drive", "2400"), (None, math.inf))
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot_path = os.path.join(directory, "city.snap")
+            tj.save_snapshot(city_map, snapshot_path)
+            shared_maps = [tj.SharedTopologyMap.from_city_map(city_map), tj.load_shared_topology(tj.DEFAULT_DATA_PATH),
+                           tj.open_snapshot(snapshot_path)]
+            for shared in shared_maps:
+                for method in ("cch", "compiled"):
+                    self.assertEqual(shared.find_shortest_path("Debug Drive", "Debug Drive", "2400", method),
+                                     (None, math.inf))
+                self.assertEqual(shared.find_shortest_path("Debug Drive", "Debug Drive", "0800"), (["Debug Drive"], 0))
+            # Release the snapshot mapping before the directory is removed
+            del shared_maps, shared
+        self.assertEqual(tj.profile_query(city_map, "Debug Drive", "Debug Drive")["2400"], (None, math.inf))
+
+class TimeDependentPathTest(unittest.TestCase):
+    def setUp(self):
+        # V -> W only exists at 0800, so it is closed until 06:30 on the way from 0500
+        self.city_map = tj.City_Map()
+        for time_period in ("0500", "0800"):
+            graph = self.city_map.add_times(time_period)
+            graph.add_edge("S", "V", 1)
+            graph.add_edge("S", "X", 5)
+            graph.add_edge("X", "V", 1)
+        self.city_map.time["0800"].add_edge("V", "W", 1)
+
+    def test_waits_for_closed_street_to_reopen(self):
+        path, total_time = tj.find_time_dependent_path(self.city_map, "S", "W", "0625")
+        self.assertEqual(path, ["S", "V", "W"])
+        self.assertEqual(total_time, 6)
+
+    def test_open_street_needs_no_wait(self):
+        self.assertEqual(tj.find_time_dependent_path(self.city_map, "S", "W", "0900"), (["S", "V", "W"], 2))
+
+    def test_arrival_never_earlier_for_later_departure(self):
+        graph = self.city_map.time_dependent_graph()
+        for edge in range(len(graph.targets)):
+            arrivals = [minute + graph.edge_cost(edge, minute) for minute in range(0, 2 * tj.MINUTES_PER_DAY, 5)]
+            self.assertEqual(arrivals, sorted(arrivals))
+
+    def test_unknown_street(self):
+        self.assertEqual(tj.find_time_dependent_path(self.city_map, "S", "Nowhere", "0625"), (None, math.inf))
+
+if __name__ == "__main__":
+    unittest.main()